@@ -0,0 +1,29 @@
+"""payroll fixed allowances
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("payroll_items")}
+    if "fixed_allowances" in columns:
+        return
+    op.add_column("payroll_items", sa.Column("fixed_allowances", sa.Numeric(12, 2), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE payroll_items SET fixed_allowances = g.housing_allowance_monthly + g.transport_allowance_monthly + g.other_allowance_monthly "
+        "FROM guards g WHERE g.id = payroll_items.guard_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("payroll_items", "fixed_allowances")
@@ -0,0 +1,30 @@
+"""payroll dirty item tracking
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("payroll_items")}
+    if "needs_recompute" not in columns:
+        op.add_column("payroll_items", sa.Column("needs_recompute", sa.Boolean(), nullable=False, server_default=sa.false()))
+        op.execute(
+            "UPDATE payroll_items SET needs_recompute = true FROM payroll_months m "
+            "WHERE m.id = payroll_items.payroll_month_id AND m.status = 'draft'"
+        )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_payroll_items_dirty ON payroll_items (payroll_month_id) WHERE needs_recompute")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_payroll_items_dirty")
+    op.drop_column("payroll_items", "needs_recompute")
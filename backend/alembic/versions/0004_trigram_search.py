@@ -0,0 +1,30 @@
+"""trigram search indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_clients_name_trgm": ("clients", "name"),
+    "ix_sites_name_trgm": ("sites", "name"),
+    "ix_guards_full_name_trgm": ("guards", "full_name"),
+    "ix_assets_asset_tag_trgm": ("assets", "asset_tag"),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, (table, column) in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
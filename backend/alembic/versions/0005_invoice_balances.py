@@ -0,0 +1,31 @@
+"""materialized invoice balances
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("invoices")}
+    if "amount_paid" in columns:
+        return
+    op.add_column("invoices", sa.Column("amount_paid", sa.Numeric(12, 2), nullable=False, server_default="0"))
+    op.add_column("invoices", sa.Column("balance_due", sa.Numeric(12, 2), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE invoices SET amount_paid = COALESCE((SELECT SUM(a.amount) FROM payment_allocations a WHERE a.invoice_id = invoices.id), 0)"
+    )
+    op.execute("UPDATE invoices SET balance_due = total - amount_paid")
+
+
+def downgrade() -> None:
+    op.drop_column("invoices", "balance_due")
+    op.drop_column("invoices", "amount_paid")
@@ -0,0 +1,32 @@
+"""per-year invoice number sequences
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("invoice_sequences"):
+        op.create_table(
+            "invoice_sequences",
+            sa.Column("year", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("last_value", sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.execute(
+        "INSERT INTO invoice_sequences (year, last_value) "
+        "SELECT split_part(invoice_no, '-', 2)::int, max(split_part(invoice_no, '-', 3)::int) FROM invoices "
+        "WHERE invoice_no ~ '^INV-[0-9]{4}-[0-9]+$' GROUP BY 1 ON CONFLICT (year) DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("invoice_sequences")
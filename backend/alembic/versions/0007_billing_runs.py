@@ -0,0 +1,42 @@
+"""billing runs and invoice billing periods
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "billing_period" not in {c["name"] for c in inspector.get_columns("invoices")}:
+        op.add_column("invoices", sa.Column("billing_period", sa.Date(), nullable=True))
+        op.create_unique_constraint("uq_invoice_client_period", "invoices", ["client_id", "billing_period"])
+    if not inspector.has_table("billing_runs"):
+        op.create_table(
+            "billing_runs",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("period", sa.Date(), nullable=False, index=True),
+            sa.Column("status", sa.Enum("queued", "running", "done", "failed", name="billing_run_status_enum"), nullable=False),
+            sa.Column("clients_total", sa.Integer(), nullable=False),
+            sa.Column("clients_done", sa.Integer(), nullable=False),
+            sa.Column("invoices_created", sa.Integer(), nullable=False),
+            sa.Column("invoices_skipped", sa.Integer(), nullable=False),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("billing_runs")
+    sa.Enum(name="billing_run_status_enum").drop(op.get_bind(), checkfirst=True)
+    op.drop_constraint("uq_invoice_client_period", "invoices", type_="unique")
+    op.drop_column("invoices", "billing_period")
@@ -0,0 +1,30 @@
+"""email outbox delivery tracking
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("email_outbox")}
+    if "attempts" not in columns:
+        op.add_column("email_outbox", sa.Column("invoice_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("invoices.id"), nullable=True))
+        op.add_column("email_outbox", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+        op.add_column("email_outbox", sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True))
+        op.add_column("email_outbox", sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("CREATE INDEX IF NOT EXISTS ix_email_outbox_due ON email_outbox (next_attempt_at) WHERE status = 'queued'")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_email_outbox_due")
+    for column in ("sent_at", "next_attempt_at", "attempts", "invoice_id"):
+        op.drop_column("email_outbox", column)
@@ -0,0 +1,25 @@
+"""receivables aging indexes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_aging ON invoices (due_date, client_id) INCLUDE (total, issue_date) "
+        "WHERE status IN ('sent', 'part_paid', 'paid')"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_payment_allocations_invoice_payment ON payment_allocations (invoice_id, payment_id) INCLUDE (amount)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_payment_allocations_invoice_payment")
+    op.execute("DROP INDEX IF EXISTS ix_invoices_aging")
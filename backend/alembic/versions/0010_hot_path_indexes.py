@@ -0,0 +1,44 @@
+"""composite indexes for hot filter paths
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_clients_created_at": "clients (created_at, id)",
+    "ix_sites_created_at": "sites (created_at, id)",
+    "ix_guards_created_at": "guards (created_at, id)",
+    "ix_assets_created_at": "assets (created_at, id)",
+    "ix_payroll_months_created_at": "payroll_months (created_at, id)",
+    "ix_invoices_created_at": "invoices (created_at, id)",
+    "ix_invoices_client_status": "invoices (client_id, status, created_at, id)",
+    "ix_invoices_client_issue_date": "invoices (client_id, issue_date)",
+    "ix_payments_created_at": "payments (created_at, id)",
+    "ix_payments_client_payment_date": "payments (client_id, payment_date) INCLUDE (amount)",
+    "ix_asset_issuances_asset_status": "asset_issuances (asset_id, status)",
+}
+
+
+def upgrade() -> None:
+    for name, target in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    duplicates = op.get_bind().scalar(sa.text(
+        "SELECT count(*) FROM (SELECT asset_id FROM asset_issuances WHERE status = 'issued' GROUP BY asset_id HAVING count(*) > 1) d"
+    ))
+    if duplicates:
+        raise RuntimeError(f"{duplicates} assets have more than one open issuance; return or mark them lost before upgrading")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_asset_issuances_open ON asset_issuances (asset_id) WHERE status = 'issued'")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_asset_issuances_open")
+    for name in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,41 @@
+"""background jobs
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("jobs"):
+        op.create_table(
+            "jobs",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("kind", sa.String(60), nullable=False),
+            sa.Column("status", sa.Enum("queued", "running", "done", "failed", name="job_status_enum"), nullable=False),
+            sa.Column("payload", sa.JSON(), nullable=False),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("progress_done", sa.Integer(), nullable=False),
+            sa.Column("progress_total", sa.Integer(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_jobs_pending ON jobs (created_at) WHERE status IN ('queued', 'running')")
+
+
+def downgrade() -> None:
+    op.drop_table("jobs")
+    sa.Enum(name="job_status_enum").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,23 @@
+"""link billing runs to their jobs
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "job_id" not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("billing_runs")}:
+        op.add_column("billing_runs", sa.Column("job_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("billing_runs", "job_id")
@@ -0,0 +1,18 @@
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+def _default(value):
+    # orjson only encodes exact uuid.UUID; asyncpg hands back its own subclass, which lands here.
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JSONResponse(ORJSONResponse):
+    # Decimals render as strings and UTC datetimes with a trailing Z, matching Pydantic's JSON output for the read schemas.
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
@@ -1,17 +1,25 @@
-from datetime import date
+import hashlib
+from datetime import date, datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy import and_, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.models.entities import Asset, AssetIssuance, Client, Guard, Invoice, Payment, PayrollAdjustment, PayrollItem, PayrollMonth, Site
+from app.api.responses import JSONResponse
+from app.db.session import get_db, get_read_db
+from app.models.entities import Asset, AssetIssuance, BillingRun, Client, Guard, Invoice, Job, Payment, PayrollAdjustment, PayrollItem, PayrollMonth, Site
+from app.schemas.common import ListResponse
 from app.schemas.entities import (
     AssetCreate,
     AssetRead,
     AssetUpdate,
+    BillingRunCreate,
+    BillingRunRead,
+    BulkIssueRequest,
+    BulkReturnRequest,
     ClientCreate,
     ClientRead,
     ClientUpdate,
@@ -19,9 +27,13 @@ from app.schemas.entities import (
     GuardRead,
     GuardUpdate,
     InvoiceCreate,
+    InvoiceDetailRead,
     InvoiceRead,
+    InvoiceSummaryRead,
+    InvoiceUpdate,
     IssueAssetRequest,
     IssuanceRead,
+    JobRead,
     LostAssetRequest,
     PaymentCreate,
     PaymentRead,
@@ -36,11 +48,85 @@ from app.schemas.entities import (
     SiteRead,
     SiteUpdate,
 )
+from app.services.billing import start_billing_run
 from app.services.core import *
+from app.services.jobs import add_job, enqueue_job, wake_workers
+from app.services.pdf import invoice_pdf_path
+from app.services.reports import aging_report, client_statement, dashboard_summary, stream_aging_csv, stream_statement_csv
+from app.services.search import search_entities
 
 router = APIRouter()
 
 
+@router.get("/dashboard/summary")
+async def get_dashboard_summary(db: AsyncSession = Depends(get_read_db)): return JSONResponse(await dashboard_summary(db))
+
+
+@router.get("/reports/aging")
+async def receivables_aging(as_of: date | None = None, format: str = "json", db: AsyncSession = Depends(get_read_db)):
+    as_of = as_of or date.today()
+    if format == "csv":
+        return StreamingResponse(stream_aging_csv(as_of), media_type="text/csv")
+    return JSONResponse(await aging_report(db, as_of))
+
+
+def page_params(cursor: str | None = None, limit: int = Query(50, ge=1, le=500), fields: str | None = None) -> dict:
+    return {"cursor": cursor, "limit": limit, "fields": [f.strip() for f in fields.split(",") if f.strip()] if fields else None}
+
+
+def page_for(schema):
+    # List rows are projected to the read schema's columns and serialised straight from the row tuples.
+    # List routes bypass response_model validation, so this is what keeps columns outside the schema private.
+    def dependency(page: dict = Depends(page_params)) -> dict:
+        unknown = [f for f in page["fields"] or [] if f not in schema.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return {**page, "fields": page["fields"] or list(schema.model_fields)}
+    return dependency
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(p.strftime("%Y%m%d%H%M%S%f") if isinstance(p, datetime) else str(p) for p in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+async def list_response(request: Request, db: AsyncSession, model, filters: list, page: dict) -> Response:
+    # Checked with a count/max(updated_at) aggregate before any rows are loaded. The aggregate only versions
+    # the filtered set, so the query (filters, cursor, limit) and projection tell its pages and shapes apart.
+    key = repr((sorted(request.query_params.multi_items()), page["fields"])).encode()
+    etag = weak_etag(*await list_version(db, model, filters), hashlib.blake2s(key, digest_size=8).hexdigest())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return JSONResponse(await list_entities(db, model, filters, **page), headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+async def get_or_304(request: Request, response: Response, db: AsyncSession, model, entity_id: UUID):
+    updated_at = await db.scalar(select(model.updated_at).where(model.id == entity_id))
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+    etag = weak_etag(updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return await get_or_404(db, model, entity_id)
+
+
+def accepted(job: Job) -> JSONResponse:
+    return JSONResponse(jsonable_encoder(JobRead.model_validate(job)), status_code=202)
+
+
 @router.post("/clients", response_model=ClientRead)
 async def create_client(payload: ClientCreate, db: AsyncSession = Depends(get_db)):
     obj = Client(**payload.model_dump())
@@ -50,15 +136,22 @@ async def create_client(payload: ClientCreate, db: AsyncSession = Depends(get_db
     return obj
 
 
-@router.get("/clients", response_model=list[ClientRead])
-async def list_clients(q: str | None = None, db: AsyncSession = Depends(get_db)):
-    filters = [Client.name.ilike(f"%{q}%")] if q else []
-    return await list_entities(db, Client, filters)
+@router.get("/clients", response_model=ListResponse[ClientRead])
+async def list_clients(request: Request, status: str | None = None, q: str | None = None, page: dict = Depends(page_for(ClientRead)), db: AsyncSession = Depends(get_read_db)):
+    filters = []
+    if status: filters.append(Client.status == status)
+    if q: filters.append(Client.name.ilike(f"%{q}%"))
+    return await list_response(request, db, Client, filters, page)
+
+
+@router.get("/clients/search", response_model=list[ClientRead])
+async def search_clients(q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    return await search_entities(db, Client, q, limit)
 
 
 @router.get("/clients/{client_id}", response_model=ClientRead)
-async def get_client(client_id: UUID, db: AsyncSession = Depends(get_db)):
-    return await get_or_404(db, Client, client_id)
+async def get_client(client_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    return await get_or_304(request, response, db, Client, client_id)
 
 
 @router.patch("/clients/{client_id}", response_model=ClientRead)
@@ -77,17 +170,22 @@ async def create_site(payload: SiteCreate, db: AsyncSession = Depends(get_db)):
     return obj
 
 
-@router.get("/sites", response_model=list[SiteRead])
-async def list_sites(client_id: UUID | None = None, status: str | None = None, q: str | None = None, db: AsyncSession = Depends(get_db)):
+@router.get("/sites", response_model=ListResponse[SiteRead])
+async def list_sites(request: Request, client_id: UUID | None = None, status: str | None = None, q: str | None = None, page: dict = Depends(page_for(SiteRead)), db: AsyncSession = Depends(get_read_db)):
     filters = []
     if client_id: filters.append(Site.client_id == client_id)
     if status: filters.append(Site.status == status)
     if q: filters.append(Site.name.ilike(f"%{q}%"))
-    return await list_entities(db, Site, filters)
+    return await list_response(request, db, Site, filters, page)
+
+
+@router.get("/sites/search", response_model=list[SiteRead])
+async def search_sites(q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    return await search_entities(db, Site, q, limit)
 
 
 @router.get("/sites/{site_id}", response_model=SiteRead)
-async def get_site(site_id: UUID, db: AsyncSession = Depends(get_db)): return await get_or_404(db, Site, site_id)
+async def get_site(site_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, Site, site_id)
 
 
 @router.patch("/sites/{site_id}", response_model=SiteRead)
@@ -102,16 +200,21 @@ async def create_guard(payload: GuardCreate, db: AsyncSession = Depends(get_db))
     obj = Guard(**payload.model_dump()); db.add(obj); await db.commit(); await db.refresh(obj); return obj
 
 
-@router.get("/guards", response_model=list[GuardRead])
-async def list_guards(status: str | None = None, q: str | None = None, db: AsyncSession = Depends(get_db)):
+@router.get("/guards", response_model=ListResponse[GuardRead])
+async def list_guards(request: Request, status: str | None = None, q: str | None = None, page: dict = Depends(page_for(GuardRead)), db: AsyncSession = Depends(get_read_db)):
     filters = []
     if status: filters.append(Guard.status == status)
     if q: filters.append(Guard.full_name.ilike(f"%{q}%"))
-    return await list_entities(db, Guard, filters)
+    return await list_response(request, db, Guard, filters, page)
+
+
+@router.get("/guards/search", response_model=list[GuardRead])
+async def search_guards(q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    return await search_entities(db, Guard, q, limit)
 
 
 @router.get("/guards/{guard_id}", response_model=GuardRead)
-async def get_guard(guard_id: UUID, db: AsyncSession = Depends(get_db)): return await get_or_404(db, Guard, guard_id)
+async def get_guard(guard_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, Guard, guard_id)
 
 
 @router.patch("/guards/{guard_id}", response_model=GuardRead)
@@ -126,18 +229,23 @@ async def create_asset(payload: AssetCreate, db: AsyncSession = Depends(get_db))
     obj = Asset(**payload.model_dump()); db.add(obj); await db.commit(); await db.refresh(obj); return obj
 
 
-@router.get("/assets", response_model=list[AssetRead])
-async def list_assets(type: str | None = None, status: str | None = None, condition: str | None = None, q: str | None = None, db: AsyncSession = Depends(get_db)):
+@router.get("/assets", response_model=ListResponse[AssetRead])
+async def list_assets(request: Request, type: str | None = None, status: str | None = None, condition: str | None = None, q: str | None = None, page: dict = Depends(page_for(AssetRead)), db: AsyncSession = Depends(get_read_db)):
     filters = []
     if type: filters.append(Asset.type == type)
     if status: filters.append(Asset.status == status)
     if condition: filters.append(Asset.condition == condition)
     if q: filters.append(Asset.asset_tag.ilike(f"%{q}%"))
-    return await list_entities(db, Asset, filters)
+    return await list_response(request, db, Asset, filters, page)
+
+
+@router.get("/assets/search", response_model=list[AssetRead])
+async def search_assets(q: str = Query(min_length=1), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    return await search_entities(db, Asset, q, limit)
 
 
 @router.get("/assets/{asset_id}", response_model=AssetRead)
-async def get_asset(asset_id: UUID, db: AsyncSession = Depends(get_db)): return await get_or_404(db, Asset, asset_id)
+async def get_asset(asset_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, Asset, asset_id)
 
 
 @router.patch("/assets/{asset_id}", response_model=AssetRead)
@@ -147,6 +255,14 @@ async def update_asset(asset_id: UUID, payload: AssetUpdate, db: AsyncSession =
     await db.commit(); await db.refresh(obj); return obj
 
 
+@router.post("/assets/issue", response_model=list[IssuanceRead])
+async def issue_many(payload: BulkIssueRequest, db: AsyncSession = Depends(get_db)): return await bulk_issue_assets(db, payload.items)
+
+
+@router.post("/assets/return", response_model=list[IssuanceRead])
+async def return_many(payload: BulkReturnRequest, db: AsyncSession = Depends(get_db)): return await bulk_return_assets(db, payload.items)
+
+
 @router.post("/assets/{asset_id}/issue", response_model=IssuanceRead)
 async def issue(asset_id: UUID, payload: IssueAssetRequest, db: AsyncSession = Depends(get_db)): return await issue_asset(db, asset_id, payload)
 
@@ -168,14 +284,18 @@ async def list_issuances(asset_id: UUID, db: AsyncSession = Depends(get_db)):
 async def create_month(payload: PayrollMonthCreate, db: AsyncSession = Depends(get_db)): return await create_payroll_month(db, payload)
 
 
-@router.get("/payroll-months", response_model=list[PayrollMonthRead])
-async def list_months(db: AsyncSession = Depends(get_db)): return await list_entities(db, PayrollMonth)
+@router.get("/payroll-months", response_model=ListResponse[PayrollMonthRead])
+async def list_months(request: Request, page: dict = Depends(page_for(PayrollMonthRead)), db: AsyncSession = Depends(get_db)):
+    return await list_response(request, db, PayrollMonth, [], page)
 
 
 @router.post("/payroll-months/{month_id}/generate-items")
-async def generate_items(month_id: UUID, db: AsyncSession = Depends(get_db)):
-    await generate_payroll_items(db, month_id)
-    return {"message": "generated"}
+async def generate_items(month_id: UUID, background: bool = False, db: AsyncSession = Depends(get_db)):
+    if background:
+        await ensure_draft_month(db, month_id)
+        return accepted(await enqueue_job(db, "payroll.generate", {"month_id": month_id}))
+    result = await generate_payroll_items(db, month_id)
+    return {"message": "generated", **result}
 
 
 @router.get("/payroll-months/{month_id}/items", response_model=list[PayrollItemRead])
@@ -191,17 +311,21 @@ async def create_adjustment(item_id: UUID, payload: PayrollAdjustmentCreate, db:
 @router.delete("/payroll-adjustments/{adj_id}")
 async def delete_adjustment(adj_id: UUID, db: AsyncSession = Depends(get_db)):
     adj = await get_or_404(db, PayrollAdjustment, adj_id)
-    item = await get_or_404(db, PayrollItem, adj.payroll_item_id)
+    item = await get_or_404(db, PayrollItem, adj.payroll_item_id, for_update=True)
     month = await get_or_404(db, PayrollMonth, item.payroll_month_id)
     if month.status != "draft":
         return {"message": "payroll locked"}
+    item.needs_recompute = True
     await db.delete(adj); await db.commit(); return {"message": "deleted"}
 
 
 @router.post("/payroll-months/{month_id}/recompute")
-async def recompute(month_id: UUID, db: AsyncSession = Depends(get_db)):
-    await recompute_payroll(db, month_id)
-    return {"message": "recomputed"}
+async def recompute(month_id: UUID, full: bool = False, background: bool = False, db: AsyncSession = Depends(get_db)):
+    if background:
+        await ensure_draft_month(db, month_id)
+        return accepted(await enqueue_job(db, "payroll.recompute", {"month_id": month_id, "full": full}))
+    count = await recompute_payroll(db, month_id, full)
+    return {"message": "recomputed", "items": count}
 
 
 @router.post("/payroll-months/{month_id}/lock")
@@ -212,36 +336,82 @@ async def lock(month_id: UUID, db: AsyncSession = Depends(get_db)):
 
 @router.get("/payroll-months/{month_id}/export.csv")
 async def export_payroll(month_id: UUID, db: AsyncSession = Depends(get_db)):
-    items = (await db.execute(select(PayrollItem).where(PayrollItem.payroll_month_id == month_id))).scalars().all()
-    lines = ["guard_id,base_salary,allowances,overtime,deductions,net_pay"]
-    for i in items:
-        lines.append(f"{i.guard_id},{i.base_salary},{i.allowances_total},{i.overtime_amount},{i.deductions_total},{i.net_pay}")
-    return StreamingResponse(iter(["\n".join(lines)]), media_type="text/csv")
+    month = await get_or_404(db, PayrollMonth, month_id)
+    headers = {"Content-Disposition": f'attachment; filename="payroll-{month.month:%Y-%m}.csv"'}
+    return StreamingResponse(stream_payroll_csv(month_id), media_type="text/csv", headers=headers)
+
+
+@router.post("/payroll-months/{month_id}/export", status_code=202, response_model=JobRead)
+async def enqueue_payroll_export(month_id: UUID, db: AsyncSession = Depends(get_db)):
+    await get_or_404(db, PayrollMonth, month_id)
+    return await enqueue_job(db, "payroll.export", {"month_id": month_id})
 
 
 @router.post("/invoices", response_model=InvoiceRead)
 async def post_invoice(payload: InvoiceCreate, db: AsyncSession = Depends(get_db)): return await create_invoice(db, payload)
 
 
-@router.get("/invoices", response_model=list[InvoiceRead])
-async def list_invoices(client_id: UUID | None = None, status: str | None = None, db: AsyncSession = Depends(get_db)):
+@router.post("/billing-runs", response_model=BillingRunRead)
+async def create_billing_run(payload: BillingRunCreate, db: AsyncSession = Depends(get_db)):
+    run = await start_billing_run(db, payload.period)
+    run.job_id = add_job(db, "billing.run", {"run_id": run.id}).id
+    await db.commit()
+    wake_workers()
+    return run
+
+
+@router.get("/billing-runs/{run_id}", response_model=BillingRunRead)
+async def get_billing_run(run_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, BillingRun, run_id)
+
+
+@router.get("/jobs", response_model=ListResponse[JobRead])
+async def list_jobs(request: Request, kind: str | None = None, status: str | None = None, page: dict = Depends(page_for(JobRead)), db: AsyncSession = Depends(get_db)):
+    filters = []
+    if kind: filters.append(Job.kind == kind)
+    if status: filters.append(Job.status == status)
+    return await list_response(request, db, Job, filters, page)
+
+
+@router.get("/jobs/{job_id}", response_model=JobRead)
+async def get_job(job_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, Job, job_id)
+
+
+@router.get("/jobs/{job_id}/file")
+async def download_job_file(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    job = await get_or_404(db, Job, job_id)
+    if job.status != "done" or not (job.result or {}).get("path"):
+        raise HTTPException(status_code=404, detail="Job has no file")
+    return FileResponse(job.result["path"], filename=job.result["filename"])
+
+
+@router.get("/invoices", response_model=ListResponse[InvoiceRead])
+async def list_invoices(request: Request, client_id: UUID | None = None, status: str | None = None, page: dict = Depends(page_for(InvoiceRead)), db: AsyncSession = Depends(get_read_db)):
+    filters = []
+    if client_id: filters.append(Invoice.client_id == client_id)
+    if status: filters.append(Invoice.status == status)
+    return await list_response(request, db, Invoice, filters, page)
+
+
+@router.get("/invoices/summaries", response_model=ListResponse[InvoiceSummaryRead])
+async def list_invoice_summaries(client_id: UUID | None = None, status: str | None = None, page: dict = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
     filters = []
     if client_id: filters.append(Invoice.client_id == client_id)
     if status: filters.append(Invoice.status == status)
-    return await list_entities(db, Invoice, filters)
+    result = await list_entities(db, Invoice, filters, cursor=page["cursor"], limit=page["limit"])
+    return {**result, "items": await attach_invoice_summaries(db, result["items"])}
 
 
-@router.get("/invoices/{invoice_id}", response_model=InvoiceRead)
-async def get_invoice(invoice_id: UUID, db: AsyncSession = Depends(get_db)): return await get_or_404(db, Invoice, invoice_id)
+@router.get("/invoices/{invoice_id}", response_model=InvoiceDetailRead)
+async def get_invoice(invoice_id: UUID, db: AsyncSession = Depends(get_db)): return await get_invoice_detail(db, invoice_id)
 
 
 @router.patch("/invoices/{invoice_id}", response_model=InvoiceRead)
-async def patch_invoice(invoice_id: UUID, payload: dict, db: AsyncSession = Depends(get_db)):
+async def patch_invoice(invoice_id: UUID, payload: InvoiceUpdate, db: AsyncSession = Depends(get_db)):
     inv = await get_or_404(db, Invoice, invoice_id)
     if inv.status != "draft":
         return inv
-    for k, v in payload.items():
-        if hasattr(inv, k): setattr(inv, k, v)
+    for k, v in payload.model_dump(exclude_unset=True).items():
+        setattr(inv, k, v)
     await db.commit(); await db.refresh(inv); return inv
 
 
@@ -258,26 +428,21 @@ async def void_invoice(invoice_id: UUID, db: AsyncSession = Depends(get_db)):
 @router.get("/invoices/{invoice_id}/pdf")
 async def invoice_pdf(invoice_id: UUID, db: AsyncSession = Depends(get_db)):
     inv = await get_or_404(db, Invoice, invoice_id)
-    content = f"Invoice {inv.invoice_no}\nTotal: {inv.total}\nStatus: {inv.status}"
-    return StreamingResponse(iter([content]), media_type="text/plain")
+    return FileResponse(await invoice_pdf_path(db, inv), media_type="application/pdf", filename=f"{inv.invoice_no}.pdf")
 
 
 @router.post("/payments", response_model=PaymentRead)
-async def post_payment(payload: PaymentCreate, db: AsyncSession = Depends(get_db)):
-    p = await create_payment(db, payload)
-    for a in payload.allocations:
-        await refresh_invoice_status(db, a.invoice_id)
-    return p
+async def post_payment(payload: PaymentCreate, db: AsyncSession = Depends(get_db)): return await create_payment(db, payload)
 
 
-@router.get("/payments", response_model=list[PaymentRead])
-async def list_payments(client_id: UUID | None = None, db: AsyncSession = Depends(get_db)):
+@router.get("/payments", response_model=ListResponse[PaymentRead])
+async def list_payments(request: Request, client_id: UUID | None = None, page: dict = Depends(page_for(PaymentRead)), db: AsyncSession = Depends(get_read_db)):
     filters = [Payment.client_id == client_id] if client_id else []
-    return await list_entities(db, Payment, filters)
+    return await list_response(request, db, Payment, filters, page)
 
 
 @router.get("/payments/{payment_id}", response_model=PaymentRead)
-async def get_payment(payment_id: UUID, db: AsyncSession = Depends(get_db)): return await get_or_404(db, Payment, payment_id)
+async def get_payment(payment_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)): return await get_or_304(request, response, db, Payment, payment_id)
 
 
 @router.patch("/payments/{payment_id}", response_model=PaymentRead)
@@ -293,17 +458,8 @@ async def patch_payment(payment_id: UUID, payload: dict, db: AsyncSession = Depe
 
 
 @router.get("/clients/{client_id}/statement")
-async def statement(client_id: UUID, from_: date = Query(alias="from"), to: date = Query(), format: str = "json", db: AsyncSession = Depends(get_db)):
-    client = await get_or_404(db, Client, client_id)
-    invoices = (await db.execute(select(Invoice).where(and_(Invoice.client_id == client_id, Invoice.issue_date >= from_, Invoice.issue_date <= to, Invoice.status != "void")))).scalars().all()
-    payments = (await db.execute(select(Payment).where(and_(Payment.client_id == client_id, Payment.payment_date >= from_, Payment.payment_date <= to)))).scalars().all()
-    opening = client.opening_balance
-    inv_total = sum([i.total for i in invoices], 0)
-    pay_total = sum([p.amount for p in payments], 0)
-    closing = opening + inv_total - pay_total
-    data = {"opening_balance": opening, "invoices": [{"invoice_no": i.invoice_no, "total": i.total} for i in invoices], "payments": [{"id": str(p.id), "amount": p.amount} for p in payments], "closing_balance": closing}
+async def statement(client_id: UUID, from_: date = Query(alias="from"), to: date = Query(), format: str = "json", db: AsyncSession = Depends(get_read_db)):
+    await get_or_404(db, Client, client_id)
     if format == "csv":
-        lines = ["type,ref,amount"] + [f"invoice,{i.invoice_no},{i.total}" for i in invoices] + [f"payment,{p.id},{p.amount}" for p in payments]
-        lines.append(f"closing,balance,{closing}")
-        return StreamingResponse(iter(["\n".join(lines)]), media_type="text/csv")
-    return data
+        return StreamingResponse(stream_statement_csv(client_id, from_, to), media_type="text/csv")
+    return JSONResponse(await client_statement(db, client_id, from_, to))
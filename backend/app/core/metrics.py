@@ -0,0 +1,74 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+request_stats: ContextVar[dict | None] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        return lines + [f"{name}_sum{{{labels}}} {self.sum:.6f}", f"{name}_count{{{labels}}} {cumulative}"]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.latency: dict = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.statements: dict = defaultdict(lambda: Histogram(STATEMENT_BUCKETS))
+        self.db_seconds: dict = defaultdict(float)
+        self.requests: dict = defaultdict(int)
+        self.collectors: list = []
+
+    def start(self) -> dict:
+        stats = {"started": time.perf_counter(), "statements": 0, "db_seconds": 0.0}
+        request_stats.set(stats)
+        return stats
+
+    def finish(self, stats: dict, method: str, route: str, status: int) -> float:
+        elapsed = time.perf_counter() - stats["started"]
+        self.requests[(method, route, status)] += 1
+        self.latency[(method, route)].observe(elapsed)
+        self.statements[(method, route)].observe(stats["statements"])
+        self.db_seconds[(method, route)] += stats["db_seconds"]
+        return elapsed
+
+    def render(self) -> str:
+        lines = ["# TYPE http_requests_total counter"]
+        lines += [f'http_requests_total{{method="{m}",route="{r}",status="{s}"}} {n}' for (m, r, s), n in sorted(self.requests.items())]
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (m, r), hist in sorted(self.latency.items()):
+            lines += hist.render("http_request_duration_seconds", f'method="{m}",route="{r}"')
+        lines.append("# TYPE http_request_sql_statements histogram")
+        for (m, r), hist in sorted(self.statements.items()):
+            lines += hist.render("http_request_sql_statements", f'method="{m}",route="{r}"')
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        lines += [f'http_request_db_seconds_total{{method="{m}",route="{r}"}} {s:.6f}' for (m, r), s in sorted(self.db_seconds.items())]
+        for collect in self.collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+def record_statement(seconds: float):
+    stats = request_stats.get()
+    if stats is not None:
+        stats["statements"] += 1
+        stats["db_seconds"] += seconds
+
+
+metrics = RequestMetrics()
@@ -1,12 +1,62 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.metrics import metrics, record_statement
+
+
+def make_engine(url: str) -> AsyncEngine:
+    options = {"pool_pre_ping": True}
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow, pool_timeout=settings.db_pool_timeout, pool_recycle=settings.db_pool_recycle)
+    if url.get_driver_name() == "asyncpg":
+        # Transaction-mode poolers (PgBouncer, Supavisor, Neon's pooler) need both prepared statement caches off: set DB_STATEMENT_CACHE_SIZE=0.
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_statement_cache_size)})
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    new_engine = create_async_engine(url, **options)
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _start_statement)
+    event.listen(new_engine.sync_engine, "after_cursor_execute", _finish_statement)
+    return new_engine
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    context.statement_started = time.perf_counter()
+
+
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    record_statement(time.perf_counter() - context.statement_started)
 
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+engine = make_engine(settings.database_url)
+read_engine = make_engine(settings.database_read_url) if settings.database_read_url else engine
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+def pool_metrics() -> list[str]:
+    engines = {"primary": engine, "replica": read_engine} if read_engine is not engine else {"primary": engine}
+    lines = []
+    for name, getter in (("size", "size"), ("checked_out", "checkedout"), ("checked_in", "checkedin"), ("overflow", "overflow")):
+        lines.append(f"# TYPE db_pool_{name} gauge")
+        for role, e in engines.items():
+            if hasattr(e.pool, getter):
+                lines.append(f'db_pool_{name}{{role="{role}"}} {getattr(e.pool, getter)()}')
+    return lines
+
+
+metrics.collectors.append(pool_metrics)
 
 
 async def get_db() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncSession:
+    # Falls back to the primary when no replica is configured; reads here may lag writes by the replica's delay.
+    async with ReadSessionLocal() as session:
+        yield session
@@ -1,14 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timedelta, timezone
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from jose import jwt
 from pydantic import BaseModel
 
+from app.api.responses import JSONResponse
 from app.api.routes import router
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.jobs import run_worker
+from app.services.pdf import shutdown_pdf_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker = asyncio.create_task(run_worker()) if settings.job_worker_in_process else None
+    yield
+    if worker:
+        # An interrupted job keeps its lease and is resumed by the next worker once it expires.
+        worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await worker
+    shutdown_pdf_pool()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan, default_response_class=JSONResponse)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = metrics.start()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    elapsed = metrics.finish(stats, request.method, route.path if route else "unmatched", response.status_code)
+    if settings.server_timing:
+        response.headers["Server-Timing"] = f'db;dur={stats["db_seconds"] * 1000:.1f};desc="{stats["statements"]} queries", app;dur={elapsed * 1000:.1f}'
+    return response
 
-app = FastAPI(title=settings.app_name)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,4 +72,9 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(router)
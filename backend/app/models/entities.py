@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from decimal import Decimal
 
-from sqlalchemy import Date, DateTime, Enum, ForeignKey, Numeric, String, Text, UniqueConstraint
+from sqlalchemy import JSON, Boolean, Date, DateTime, Enum, ForeignKey, Index, Numeric, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin, UUIDMixin
@@ -9,6 +9,7 @@ from app.models.base import Base, TimestampMixin, UUIDMixin
 
 class Client(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "clients"
+    __table_args__ = (Index("ix_clients_created_at", "created_at", "id"),)
 
     name: Mapped[str] = mapped_column(String(200), unique=True, index=True)
     contact_name: Mapped[str | None] = mapped_column(String(120))
@@ -23,7 +24,10 @@ class Client(UUIDMixin, TimestampMixin, Base):
 
 class Site(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "sites"
-    __table_args__ = (UniqueConstraint("client_id", "name", name="uq_site_name_per_client"),)
+    __table_args__ = (
+        UniqueConstraint("client_id", "name", name="uq_site_name_per_client"),
+        Index("ix_sites_created_at", "created_at", "id"),
+    )
 
     client_id = mapped_column(ForeignKey("clients.id"), index=True)
     name: Mapped[str] = mapped_column(String(200))
@@ -43,6 +47,7 @@ class Site(UUIDMixin, TimestampMixin, Base):
 
 class Guard(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "guards"
+    __table_args__ = (Index("ix_guards_created_at", "created_at", "id"),)
     guard_no: Mapped[str] = mapped_column(String(40), unique=True, index=True)
     full_name: Mapped[str] = mapped_column(String(200))
     phone: Mapped[str | None] = mapped_column(String(40))
@@ -76,22 +81,28 @@ class GuardAdvance(UUIDMixin, Base):
 
 class PayrollMonth(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "payroll_months"
+    __table_args__ = (Index("ix_payroll_months_created_at", "created_at", "id"),)
     month: Mapped[date] = mapped_column(Date, unique=True)
     status: Mapped[str] = mapped_column(Enum("draft", "locked", "paid", name="payroll_month_status_enum"), default="draft")
 
 
 class PayrollItem(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "payroll_items"
-    __table_args__ = (UniqueConstraint("payroll_month_id", "guard_id", name="uq_payroll_item_guard_month"),)
+    __table_args__ = (
+        UniqueConstraint("payroll_month_id", "guard_id", name="uq_payroll_item_guard_month"),
+        Index("ix_payroll_items_dirty", "payroll_month_id", postgresql_where=text("needs_recompute")),
+    )
 
     payroll_month_id = mapped_column(ForeignKey("payroll_months.id"), index=True)
     guard_id = mapped_column(ForeignKey("guards.id"), index=True)
     base_salary: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
+    fixed_allowances: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     allowances_total: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     overtime_amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     deductions_total: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     advances_deducted: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     net_pay: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
+    needs_recompute: Mapped[bool] = mapped_column(Boolean, default=False)
     notes: Mapped[str | None] = mapped_column(Text)
 
 
@@ -106,6 +117,7 @@ class PayrollAdjustment(UUIDMixin, Base):
 
 class Asset(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "assets"
+    __table_args__ = (Index("ix_assets_created_at", "created_at", "id"),)
     asset_tag: Mapped[str] = mapped_column(String(80), unique=True)
     type: Mapped[str] = mapped_column(Enum("gun", "uniform", "radio", "torch", "baton", "handcuffs", "other", name="asset_type_enum"))
     name: Mapped[str | None] = mapped_column(String(200))
@@ -119,6 +131,10 @@ class Asset(UUIDMixin, TimestampMixin, Base):
 
 class AssetIssuance(UUIDMixin, Base):
     __tablename__ = "asset_issuances"
+    __table_args__ = (
+        Index("ix_asset_issuances_asset_status", "asset_id", "status"),
+        Index("uq_asset_issuances_open", "asset_id", unique=True, postgresql_where=text("status = 'issued'")),
+    )
     asset_id = mapped_column(ForeignKey("assets.id"), index=True)
     guard_id = mapped_column(ForeignKey("guards.id"), index=True)
     site_id = mapped_column(ForeignKey("sites.id"), nullable=True)
@@ -134,6 +150,13 @@ class AssetIssuance(UUIDMixin, Base):
 
 class Invoice(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        UniqueConstraint("client_id", "billing_period", name="uq_invoice_client_period"),
+        Index("ix_invoices_created_at", "created_at", "id"),
+        Index("ix_invoices_client_status", "client_id", "status", "created_at", "id"),
+        Index("ix_invoices_client_issue_date", "client_id", "issue_date"),
+        Index("ix_invoices_aging", "due_date", "client_id", postgresql_where=text("status IN ('sent', 'part_paid', 'paid')"), postgresql_include=["total", "issue_date"]),
+    )
     client_id = mapped_column(ForeignKey("clients.id"), index=True)
     invoice_no: Mapped[str] = mapped_column(String(60), unique=True, index=True)
     issue_date: Mapped[date] = mapped_column(Date)
@@ -143,9 +166,49 @@ class Invoice(UUIDMixin, TimestampMixin, Base):
     subtotal: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     tax_total: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     total: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
+    amount_paid: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
+    balance_due: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
     notes: Mapped[str | None] = mapped_column(Text)
     sent_to_email: Mapped[str | None] = mapped_column(String(120))
     sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    billing_period: Mapped[date | None] = mapped_column(Date)
+
+    items: Mapped[list["InvoiceItem"]] = relationship(order_by="InvoiceItem.created_at", lazy="raise")
+    allocations: Mapped[list["PaymentAllocation"]] = relationship(order_by="PaymentAllocation.created_at", lazy="raise")
+
+
+class InvoiceSequence(Base):
+    __tablename__ = "invoice_sequences"
+    year: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    last_value: Mapped[int] = mapped_column(default=0)
+
+
+class BillingRun(UUIDMixin, TimestampMixin, Base):
+    __tablename__ = "billing_runs"
+    period: Mapped[date] = mapped_column(Date, index=True)
+    status: Mapped[str] = mapped_column(Enum("queued", "running", "done", "failed", name="billing_run_status_enum"), default="queued")
+    clients_total: Mapped[int] = mapped_column(default=0)
+    clients_done: Mapped[int] = mapped_column(default=0)
+    invoices_created: Mapped[int] = mapped_column(default=0)
+    invoices_skipped: Mapped[int] = mapped_column(default=0)
+    job_id = mapped_column(ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text)
+
+
+class Job(UUIDMixin, TimestampMixin, Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_pending", "created_at", postgresql_where=text("status IN ('queued', 'running')")),)
+    kind: Mapped[str] = mapped_column(String(60))
+    status: Mapped[str] = mapped_column(Enum("queued", "running", "done", "failed", name="job_status_enum"), default="queued")
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    result: Mapped[dict | None] = mapped_column(JSON)
+    progress_done: Mapped[int] = mapped_column(default=0)
+    progress_total: Mapped[int] = mapped_column(default=0)
+    attempts: Mapped[int] = mapped_column(default=0)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    error: Mapped[str | None] = mapped_column(Text)
 
 
 class InvoiceItem(UUIDMixin, Base):
@@ -161,6 +224,10 @@ class InvoiceItem(UUIDMixin, Base):
 
 class Payment(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_created_at", "created_at", "id"),
+        Index("ix_payments_client_payment_date", "client_id", "payment_date", postgresql_include=["amount"]),
+    )
     client_id = mapped_column(ForeignKey("clients.id"), index=True)
     payment_date: Mapped[date] = mapped_column(Date)
     amount: Mapped[Decimal] = mapped_column(Numeric(12, 2))
@@ -171,20 +238,30 @@ class Payment(UUIDMixin, TimestampMixin, Base):
 
 class PaymentAllocation(UUIDMixin, Base):
     __tablename__ = "payment_allocations"
-    __table_args__ = (UniqueConstraint("payment_id", "invoice_id", name="uq_payment_invoice"),)
+    __table_args__ = (
+        UniqueConstraint("payment_id", "invoice_id", name="uq_payment_invoice"),
+        Index("ix_payment_allocations_invoice_payment", "invoice_id", "payment_id", postgresql_include=["amount"]),
+    )
     payment_id = mapped_column(ForeignKey("payments.id", ondelete="CASCADE"), index=True)
     invoice_id = mapped_column(ForeignKey("invoices.id"), index=True)
     amount: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
+    payment: Mapped["Payment"] = relationship(lazy="raise")
+
 
 class EmailOutbox(UUIDMixin, Base):
     __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_due", "next_attempt_at", postgresql_where=text("status = 'queued'")),)
     type: Mapped[str] = mapped_column(Enum("invoice", "statement", name="email_type_enum"))
     to_email: Mapped[str] = mapped_column(String(120))
     subject: Mapped[str] = mapped_column(String(200))
     body: Mapped[str] = mapped_column(Text)
     attachment_path: Mapped[str | None] = mapped_column(String(240))
+    invoice_id = mapped_column(ForeignKey("invoices.id"), nullable=True)
     status: Mapped[str] = mapped_column(Enum("queued", "sent", "failed", name="email_status_enum"), default="queued")
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     error: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
@@ -28,4 +28,5 @@ T = TypeVar("T")
 
 class ListResponse(BaseModel, Generic[T]):
     items: list[T]
-    total: int
+    total: int | None = None
+    next_cursor: str | None = None
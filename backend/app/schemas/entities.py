@@ -2,7 +2,7 @@ from datetime import date, datetime
 from decimal import Decimal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
 
 
 class ORMModel(BaseModel):
@@ -119,6 +119,33 @@ class ReturnAssetRequest(BaseModel):
     notes: str | None = None
 
 
+class AssetRef(BaseModel):
+    asset_id: UUID | None = None
+    asset_tag: str | None = None
+
+    @model_validator(mode="after")
+    def one_asset_key(self):
+        if (self.asset_id is None) == (self.asset_tag is None):
+            raise ValueError("Give exactly one of asset_id or asset_tag")
+        return self
+
+
+class BulkIssueItem(AssetRef, IssueAssetRequest):
+    pass
+
+
+class BulkIssueRequest(BaseModel):
+    items: list[BulkIssueItem]
+
+
+class BulkReturnItem(AssetRef, ReturnAssetRequest):
+    pass
+
+
+class BulkReturnRequest(BaseModel):
+    items: list[BulkReturnItem]
+
+
 class LostAssetRequest(BaseModel):
     notes: str | None = None
 
@@ -186,6 +213,12 @@ class InvoiceCreate(BaseModel):
     items: list[InvoiceItemInput]
 
 
+class InvoiceUpdate(BaseModel):
+    issue_date: date | None = None
+    due_date: date | None = None
+    notes: str | None = None
+
+
 class InvoiceRead(ORMModel):
     id: UUID
     client_id: UUID
@@ -196,6 +229,68 @@ class InvoiceRead(ORMModel):
     subtotal: Decimal
     tax_total: Decimal
     total: Decimal
+    amount_paid: Decimal
+    balance_due: Decimal
+
+
+class InvoiceItemRead(ORMModel):
+    id: UUID
+    site_id: UUID | None
+    description: str
+    quantity: Decimal
+    unit_price: Decimal
+    amount: Decimal
+
+
+class InvoiceAllocationRead(ORMModel):
+    id: UUID
+    payment_id: UUID
+    amount: Decimal
+    payment: "PaymentRead"
+
+
+class InvoiceDetailRead(InvoiceRead):
+    currency: str
+    notes: str | None
+    items: list[InvoiceItemRead]
+    allocations: list[InvoiceAllocationRead]
+
+
+class InvoiceSummaryRead(InvoiceRead):
+    item_count: int
+    allocation_count: int
+    last_payment_date: date | None
+
+
+class BillingRunCreate(BaseModel):
+    period: date
+
+
+class BillingRunRead(ORMModel):
+    id: UUID
+    period: date
+    status: str
+    clients_total: int
+    clients_done: int
+    invoices_created: int
+    invoices_skipped: int
+    job_id: UUID | None
+    error: str | None
+
+
+class JobRead(ORMModel):
+    id: UUID
+    kind: str
+    status: str
+    payload: dict
+    result: dict | None
+    progress_done: int
+    progress_total: int
+    attempts: int
+    started_at: datetime | None
+    finished_at: datetime | None
+    error: str | None
+    created_at: datetime
 
 
 class SendInvoiceRequest(BaseModel):
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.entities import BillingRun, Client, Invoice, InvoiceItem, Job, Site
+from app.services.core import allocate_invoice_numbers
+
+QUARTER_START_MONTHS = (1, 4, 7, 10)
+
+
+def cycle_months(billing_cycle: str, period: date) -> int:
+    if billing_cycle == "monthly":
+        return 1
+    if billing_cycle == "quarterly" and period.month in QUARTER_START_MONTHS:
+        return 3
+    return 0
+
+
+async def start_billing_run(session: AsyncSession, period: date) -> BillingRun:
+    # Adds the run without committing: the caller commits it together with its job.
+    period = period.replace(day=1)
+    now = datetime.utcnow()
+    unfinished = (BillingRun.period == period, BillingRun.status.in_(["queued", "running"]))
+    live_job = select(Job.id).where(Job.id == BillingRun.job_id, or_(Job.status == "queued", and_(Job.status == "running", Job.locked_until >= now))).exists()
+    if await session.scalar(select(BillingRun.id).where(*unfinished, live_job).limit(1)):
+        raise HTTPException(status_code=409, detail="A billing run for this period is already in progress")
+    # Any other unfinished run lost its job (a crash, or a failed job) and would block the period forever.
+    stale_jobs = (await session.scalars(
+        update(BillingRun).where(*unfinished).values(status="failed", error="Abandoned: its job stopped before the run finished").returning(BillingRun.job_id)
+    )).all()
+    if any(stale_jobs):
+        await session.execute(
+            update(Job).where(Job.id.in_([j for j in stale_jobs if j]), Job.status.in_(["queued", "running"])).values(status="failed", error="Superseded by a new billing run", locked_until=None)
+        )
+    run = BillingRun(period=period, status="queued")
+    session.add(run)
+    await session.flush()
+    return run
+
+
+async def billable_sites(session: AsyncSession, period: date) -> dict:
+    already_billed = select(Invoice.id).where(Invoice.client_id == Client.id, Invoice.billing_period == period).exists()
+    stmt = (
+        select(Client.id, Client.billing_cycle, Site.id, Site.name, Site.billing_rate_monthly)
+        .join(Site, Site.client_id == Client.id)
+        .where(
+            Client.status == "active",
+            Client.billing_cycle.in_(["monthly", "quarterly"]),
+            Site.status == "active",
+            Site.billing_rate_monthly.is_not(None),
+            ~already_billed,
+        )
+        .order_by(Client.id, Site.name)
+    )
+    sites = defaultdict(list)
+    for client_id, billing_cycle, site_id, name, rate in await session.execute(stmt):
+        months = cycle_months(billing_cycle, period)
+        if months:
+            sites[client_id].append((site_id, name, rate, months))
+    return sites
+
+
+async def invoice_clients(session: AsyncSession, period: date, sites_by_client: dict) -> int:
+    due_date = period + timedelta(days=settings.invoice_due_days)
+    numbers = await allocate_invoice_numbers(session, period.year, len(sites_by_client))
+    invoices, items = [], []
+    for (client_id, sites), invoice_no in zip(sites_by_client.items(), numbers):
+        invoice_id = uuid4()
+        subtotal = Decimal("0")
+        for site_id, name, rate, months in sites:
+            subtotal += rate * months
+            items.append({
+                "id": uuid4(),
+                "invoice_id": invoice_id,
+                "site_id": site_id,
+                "description": f"Guarding services - {name} - {period:%B %Y}",
+                "quantity": Decimal(months),
+                "unit_price": rate,
+                "amount": rate * months,
+            })
+        invoices.append({
+            "id": invoice_id,
+            "client_id": client_id,
+            "invoice_no": invoice_no,
+            "issue_date": period,
+            "due_date": due_date,
+            "subtotal": subtotal,
+            "tax_total": Decimal("0"),
+            "total": subtotal,
+            "balance_due": subtotal,
+            "status": "draft",
+            "billing_period": period,
+        })
+    await session.execute(insert(Invoice), invoices)
+    await session.execute(insert(InvoiceItem), items)
+    return len(invoices)
+
+
+async def run_billing(run_id: UUID, progress=None) -> dict:
+    async with SessionLocal() as session:
+        run = await session.get(BillingRun, run_id)
+        first_attempt = run.status == "queued"
+        run.status = "running"
+        sites = await billable_sites(session, run.period)
+        # A retried run resumes: clients invoiced by earlier attempts are no longer billable, and each got one invoice.
+        run.clients_done = run.invoices_created
+        run.clients_total = run.invoices_created + len(sites)
+        if first_attempt:
+            run.invoices_skipped = await session.scalar(select(func.count()).select_from(Invoice).where(Invoice.billing_period == run.period))
+        await session.commit()
+        client_ids = list(sites)
+        for start in range(0, len(client_ids), settings.billing_run_chunk_size):
+            chunk = client_ids[start:start + settings.billing_run_chunk_size]
+            created = await invoice_clients(session, run.period, {c: sites[c] for c in chunk})
+            run.clients_done += len(chunk)
+            run.invoices_created += created
+            await session.commit()
+            if progress:
+                await progress(run.clients_done, run.clients_total)
+        run.status = "done"
+        await session.commit()
+        return {"invoices_created": run.invoices_created, "invoices_skipped": run.invoices_skipped}
+
+
+async def fail_billing_run(session: AsyncSession, run_id: UUID, error: str):
+    await session.execute(update(BillingRun).where(BillingRun.id == run_id, BillingRun.status.in_(["queued", "running"])).values(status="failed", error=error))
@@ -1,11 +1,18 @@
+import csv
+import io
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import Select, and_, func, select
+from sqlalchemy import Select, and_, case, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from app.db.session import SessionLocal
 from app.models.entities import (
     Asset,
     AssetIssuance,
@@ -14,6 +21,7 @@ from app.models.entities import (
     Guard,
     Invoice,
     InvoiceItem,
+    InvoiceSequence,
     Payment,
     PaymentAllocation,
     PayrollAdjustment,
@@ -23,49 +31,170 @@ from app.models.entities import (
 )
 
 
-async def list_entities(session: AsyncSession, model, filters: list = []):
-    q: Select = select(model)
+def encode_cursor(created_at: datetime, entity_id: UUID) -> str:
+    return urlsafe_b64encode(f"{created_at.isoformat()}|{entity_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, entity_id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(entity_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def list_entities(session: AsyncSession, model, filters: list = [], cursor: str | None = None, limit: int = 50, fields: list[str] | None = None):
+    columns = model.__table__.columns
+    if fields:
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        fields = list(dict.fromkeys(["id", *fields]))
+        q: Select = select(*[columns[f] for f in fields], model.created_at.label("_created_at"))
+    else:
+        q = select(model)
     for f in filters:
         q = q.where(f)
-    rows = (await session.execute(q.order_by(model.created_at.desc() if hasattr(model, 'created_at') else model.id.desc()))).scalars().all()
-    return rows
+    total = None
+    if cursor:
+        created_at, entity_id = decode_cursor(cursor)
+        q = q.where(tuple_(model.created_at, model.id) < tuple_(created_at, entity_id))
+    else:
+        total = await session.scalar(select(func.count()).select_from(model).where(*filters))
+    result = await session.execute(q.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1))
+    if fields:
+        rows = result.all()
+        items = [dict(zip(fields, r)) for r in rows[:limit]]
+        last = (rows[limit - 1]._created_at, rows[limit - 1].id) if len(rows) > limit else None
+    else:
+        rows = result.scalars().all()
+        items = rows[:limit]
+        last = (rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return {"items": items, "total": total, "next_cursor": encode_cursor(*last) if last else None}
+
+
+async def list_version(session: AsyncSession, model, filters: list = []) -> tuple[int, datetime | None]:
+    return tuple((await session.execute(select(func.count(), func.max(model.updated_at)).select_from(model).where(*filters))).one())
 
 
-async def get_or_404(session: AsyncSession, model, entity_id: UUID):
-    entity = await session.get(model, entity_id)
+async def get_or_404(session: AsyncSession, model, entity_id: UUID, for_update: bool = False):
+    entity = await session.get(model, entity_id, with_for_update=for_update or None)
     if not entity:
         raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
     return entity
 
 
 async def issue_asset(session: AsyncSession, asset_id: UUID, payload):
-    asset = await get_or_404(session, Asset, asset_id)
-    if asset.status != "available":
+    # The conditional update takes the asset row lock, so concurrent issues of one asset serialise and only one matches.
+    claimed = await session.scalar(update(Asset).where(Asset.id == asset_id, Asset.status == "available").values(status="issued").returning(Asset.id))
+    if claimed is None:
+        await get_or_404(session, Asset, asset_id)
         raise HTTPException(status_code=400, detail="Asset is not available")
-    open_issue = await session.scalar(select(func.count()).select_from(AssetIssuance).where(and_(AssetIssuance.asset_id == asset_id, AssetIssuance.status == "issued")))
-    if open_issue:
-        raise HTTPException(status_code=400, detail="Asset already has open issuance")
     issuance = AssetIssuance(asset_id=asset_id, **payload.model_dump())
-    asset.status = "issued"
     session.add(issuance)
-    await session.commit()
-    await session.refresh(issuance)
+    try:
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        if "uq_asset_issuances_open" not in str(exc.orig):
+            raise
+        raise HTTPException(status_code=409, detail="Asset already has open issuance")
     return issuance
 
 
+def close_issuance(issuance: AssetIssuance, asset: Asset, return_condition: str):
+    issuance.status = "returned"
+    issuance.returned_at = datetime.utcnow()
+    issuance.return_condition = return_condition
+    asset.status = "maintenance" if return_condition == "damaged" else "available"
+
+
 async def return_issuance(session: AsyncSession, issuance_id: UUID, payload):
     issuance = await get_or_404(session, AssetIssuance, issuance_id)
     if issuance.status != "issued":
         raise HTTPException(status_code=400, detail="Issuance is not open")
     asset = await get_or_404(session, Asset, issuance.asset_id)
-    issuance.status = "returned"
-    issuance.returned_at = datetime.utcnow()
-    issuance.return_condition = payload.return_condition
-    asset.status = "maintenance" if payload.return_condition == "damaged" else "available"
+    close_issuance(issuance, asset, payload.return_condition)
     await session.commit()
     return issuance
 
 
+def asset_keys(items) -> tuple[set, set]:
+    return {i.asset_id for i in items if i.asset_id}, {i.asset_tag for i in items if i.asset_tag and not i.asset_id}
+
+
+def match_asset(item, by_id: dict, by_tag: dict):
+    return by_id.get(item.asset_id) if item.asset_id else by_tag.get(item.asset_tag)
+
+
+def raise_item_errors(errors: list):
+    if errors:
+        raise HTTPException(status_code=400, detail={"errors": errors})
+
+
+async def bulk_issue_assets(session: AsyncSession, items) -> list[AssetIssuance]:
+    ids, tags = asset_keys(items)
+    assets = (await session.execute(
+        select(Asset).where(or_(Asset.id.in_(ids), Asset.asset_tag.in_(tags))).order_by(Asset.id).with_for_update()
+    )).scalars().all()
+    by_id, by_tag = {a.id: a for a in assets}, {a.asset_tag: a for a in assets}
+    errors, seen, issuances = [], set(), []
+    for index, item in enumerate(items):
+        asset = match_asset(item, by_id, by_tag)
+        ref = str(item.asset_id or item.asset_tag)
+        if asset is None:
+            errors.append({"index": index, "asset": ref, "detail": "Asset not found"})
+        elif asset.id in seen:
+            errors.append({"index": index, "asset": ref, "detail": "Asset listed more than once"})
+        elif asset.status != "available":
+            errors.append({"index": index, "asset": ref, "detail": "Asset is not available"})
+        else:
+            seen.add(asset.id)
+            asset.status = "issued"
+            issuances.append(AssetIssuance(asset_id=asset.id, **item.model_dump(exclude={"asset_id", "asset_tag"})))
+    if errors:
+        await session.rollback()
+        raise_item_errors(errors)
+    session.add_all(issuances)
+    try:
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        if "uq_asset_issuances_open" not in str(exc.orig):
+            raise
+        raise HTTPException(status_code=409, detail="An asset already has an open issuance")
+    return issuances
+
+
+async def bulk_return_assets(session: AsyncSession, items) -> list[AssetIssuance]:
+    ids, tags = asset_keys(items)
+    rows = (await session.execute(
+        select(AssetIssuance, Asset)
+        .join(Asset, Asset.id == AssetIssuance.asset_id)
+        .where(AssetIssuance.status == "issued", or_(Asset.id.in_(ids), Asset.asset_tag.in_(tags)))
+        .order_by(Asset.id)
+        .with_for_update()
+    )).all()
+    by_id, by_tag = {a.id: (i, a) for i, a in rows}, {a.asset_tag: (i, a) for i, a in rows}
+    errors, seen, returned = [], set(), []
+    for index, item in enumerate(items):
+        match = match_asset(item, by_id, by_tag)
+        ref = str(item.asset_id or item.asset_tag)
+        if match is None:
+            errors.append({"index": index, "asset": ref, "detail": "No open issuance for asset"})
+        elif match[1].id in seen:
+            errors.append({"index": index, "asset": ref, "detail": "Asset listed more than once"})
+        else:
+            seen.add(match[1].id)
+            close_issuance(*match, item.return_condition)
+            returned.append(match[0])
+    if errors:
+        await session.rollback()
+        raise_item_errors(errors)
+    await session.commit()
+    return returned
+
+
 async def lost_issuance(session: AsyncSession, issuance_id: UUID, payload):
     issuance = await get_or_404(session, AssetIssuance, issuance_id)
     asset = await get_or_404(session, Asset, issuance.asset_id)
@@ -95,38 +224,100 @@ async def ensure_draft_month(session: AsyncSession, month_id: UUID):
 
 async def generate_payroll_items(session: AsyncSession, month_id: UUID):
     month = await ensure_draft_month(session, month_id)
-    guards = (await session.execute(select(Guard).where(Guard.status == "active"))).scalars().all()
-    for g in guards:
-        exists = await session.scalar(select(PayrollItem.id).where(and_(PayrollItem.payroll_month_id == month.id, PayrollItem.guard_id == g.id)))
-        if exists:
-            continue
-        allowances = g.housing_allowance_monthly + g.transport_allowance_monthly + g.other_allowance_monthly
-        net = g.base_salary_monthly + allowances
-        session.add(PayrollItem(payroll_month_id=month.id, guard_id=g.id, base_salary=g.base_salary_monthly, allowances_total=allowances, net_pay=net))
+    active = Guard.status == "active"
+    allowances = Guard.housing_allowance_monthly + Guard.transport_allowance_monthly + Guard.other_allowance_monthly
+    now = datetime.utcnow()
+    rows = select(
+        func.gen_random_uuid(),
+        literal(month.id, PayrollItem.payroll_month_id.type),
+        Guard.id,
+        Guard.base_salary_monthly,
+        allowances,
+        allowances,
+        Guard.base_salary_monthly + allowances,
+        literal(now, PayrollItem.created_at.type),
+        literal(now, PayrollItem.updated_at.type),
+    ).where(active)
+    cols = ["id", "payroll_month_id", "guard_id", "base_salary", "fixed_allowances", "allowances_total", "net_pay", "created_at", "updated_at"]
+    stmt = pg_insert(PayrollItem).from_select(cols, rows).on_conflict_do_nothing(constraint="uq_payroll_item_guard_month")
+    created = (await session.execute(stmt)).rowcount
+    eligible = await session.scalar(select(func.count()).select_from(Guard).where(active))
     await session.commit()
+    return {"created": created, "skipped": eligible - created}
 
 
-async def recompute_payroll(session: AsyncSession, month_id: UUID):
+async def recompute_payroll(session: AsyncSession, month_id: UUID, full: bool = False):
     await ensure_draft_month(session, month_id)
-    items = (await session.execute(select(PayrollItem).where(PayrollItem.payroll_month_id == month_id))).scalars().all()
-    for item in items:
-        adjs = (await session.execute(select(PayrollAdjustment).where(PayrollAdjustment.payroll_item_id == item.id))).scalars().all()
-        allowance = sum([a.amount for a in adjs if a.type == "allowance"], Decimal("0"))
-        overtime = sum([a.amount for a in adjs if a.type == "overtime"], Decimal("0"))
-        deduction = sum([a.amount for a in adjs if a.type == "deduction"], Decimal("0"))
-        item.overtime_amount = overtime
-        item.deductions_total = deduction
-        item.allowances_total = item.allowances_total + allowance
-        item.net_pay = item.base_salary + item.allowances_total + item.overtime_amount - item.deductions_total - item.advances_deducted
+    dirty = select(PayrollItem.id).where(PayrollItem.payroll_month_id == month_id).order_by(PayrollItem.id)
+    if not full:
+        dirty = dirty.where(PayrollItem.needs_recompute.is_(True))
+    # Locked before aggregating: an adjustment committed first is in the sums below, and one written after
+    # waits for this commit and marks its item dirty again, so clearing the flag never hides it.
+    item_ids = (await session.scalars(dirty.with_for_update())).all()
+    if not item_ids:
+        await session.commit()
+        return 0
+
+    def total(kind):
+        return func.coalesce(func.sum(case((PayrollAdjustment.type == kind, PayrollAdjustment.amount), else_=0)), 0)
+
+    sums = (
+        select(PayrollItem.id.label("item_id"), total("allowance").label("allowance"), total("overtime").label("overtime"), total("deduction").label("deduction"))
+        .outerjoin(PayrollAdjustment, PayrollAdjustment.payroll_item_id == PayrollItem.id)
+        .where(PayrollItem.id.in_(item_ids))
+        .group_by(PayrollItem.id)
+        .subquery()
+    )
+    stmt = (
+        update(PayrollItem)
+        .where(PayrollItem.id == sums.c.item_id)
+        .values(
+            allowances_total=PayrollItem.fixed_allowances + sums.c.allowance,
+            overtime_amount=sums.c.overtime,
+            deductions_total=sums.c.deduction,
+            net_pay=PayrollItem.base_salary + PayrollItem.fixed_allowances + sums.c.allowance + sums.c.overtime - sums.c.deduction - PayrollItem.advances_deducted,
+            needs_recompute=False,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
     await session.commit()
+    return result.rowcount
+
+
+PAYROLL_CSV_COLUMNS = ["guard_no", "full_name", "base_salary", "allowances", "overtime", "deductions", "advances", "net_pay"]
+
+
+def csv_chunk(rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+async def stream_payroll_csv(month_id: UUID, chunk_size: int = 1000):
+    # Owns its session: the request-scoped one is closed before the response body is sent.
+    stmt = (
+        select(Guard.guard_no, Guard.full_name, PayrollItem.base_salary, PayrollItem.allowances_total, PayrollItem.overtime_amount, PayrollItem.deductions_total, PayrollItem.advances_deducted, PayrollItem.net_pay)
+        .join(Guard, Guard.id == PayrollItem.guard_id)
+        .where(PayrollItem.payroll_month_id == month_id)
+        .order_by(Guard.guard_no)
+        .execution_options(yield_per=chunk_size)
+    )
+    yield csv_chunk([PAYROLL_CSV_COLUMNS])
+    async with SessionLocal() as session:
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            yield csv_chunk(rows)
 
 
 async def add_adjustment(session: AsyncSession, payroll_item_id: UUID, payload):
-    item = await get_or_404(session, PayrollItem, payroll_item_id)
+    # Locked so a recompute in flight finishes first; the flag set below then always lands after it is cleared.
+    item = await get_or_404(session, PayrollItem, payroll_item_id, for_update=True)
     month = await get_or_404(session, PayrollMonth, item.payroll_month_id)
     if month.status != "draft":
         raise HTTPException(status_code=400, detail="Payroll month is locked")
     adj = PayrollAdjustment(payroll_item_id=payroll_item_id, **payload.model_dump())
+    item.needs_recompute = True
     session.add(adj)
     await session.commit()
     await session.refresh(adj)
@@ -139,11 +330,20 @@ async def lock_payroll(session: AsyncSession, month_id: UUID):
     await session.commit()
 
 
+async def allocate_invoice_numbers(session: AsyncSession, year: int, count: int = 1) -> list[str]:
+    # The upsert row-locks the year's counter until commit, so numbers stay unique and gap-free.
+    stmt = (
+        pg_insert(InvoiceSequence)
+        .values(year=year, last_value=count)
+        .on_conflict_do_update(index_elements=["year"], set_={"last_value": InvoiceSequence.last_value + count})
+        .returning(InvoiceSequence.last_value)
+    )
+    last = await session.scalar(stmt)
+    return [f"INV-{year}-{n:05d}" for n in range(last - count + 1, last + 1)]
+
+
 async def create_invoice(session: AsyncSession, payload):
-    year = payload.issue_date.year
-    like = f"INV-{year}-%"
-    seq = await session.scalar(select(func.count()).select_from(Invoice).where(Invoice.invoice_no.like(like)))
-    invoice_no = f"INV-{year}-{seq + 1:05d}"
+    [invoice_no] = await allocate_invoice_numbers(session, payload.issue_date.year)
     subtotal = sum([(i.quantity * i.unit_price) for i in payload.items], Decimal("0"))
     total = subtotal + payload.tax_total
     inv = Invoice(
@@ -155,6 +355,7 @@ async def create_invoice(session: AsyncSession, payload):
         tax_total=payload.tax_total,
         subtotal=subtotal,
         total=total,
+        balance_due=total,
         status="draft",
         notes=payload.notes,
     )
@@ -167,6 +368,33 @@ async def create_invoice(session: AsyncSession, payload):
     return inv
 
 
+async def get_invoice_detail(session: AsyncSession, invoice_id: UUID) -> Invoice:
+    stmt = select(Invoice).where(Invoice.id == invoice_id).options(
+        selectinload(Invoice.items),
+        selectinload(Invoice.allocations).selectinload(PaymentAllocation.payment),
+    )
+    inv = await session.scalar(stmt)
+    if not inv:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return inv
+
+
+async def attach_invoice_summaries(session: AsyncSession, invoices: list[Invoice]) -> list[Invoice]:
+    item_count = select(func.count()).select_from(InvoiceItem).where(InvoiceItem.invoice_id == Invoice.id).scalar_subquery()
+    allocation_count = select(func.count()).select_from(PaymentAllocation).where(PaymentAllocation.invoice_id == Invoice.id).scalar_subquery()
+    last_payment = (
+        select(func.max(Payment.payment_date))
+        .join(PaymentAllocation, PaymentAllocation.payment_id == Payment.id)
+        .where(PaymentAllocation.invoice_id == Invoice.id)
+        .scalar_subquery()
+    )
+    stmt = select(Invoice.id, item_count, allocation_count, last_payment).where(Invoice.id.in_([i.id for i in invoices]))
+    summaries = {row[0]: row[1:] for row in await session.execute(stmt)}
+    for inv in invoices:
+        inv.item_count, inv.allocation_count, inv.last_payment_date = summaries[inv.id]
+    return invoices
+
+
 async def send_invoice(session: AsyncSession, invoice_id: UUID, to_email: str):
     inv = await get_or_404(session, Invoice, invoice_id)
     if inv.status == "void":
@@ -174,44 +402,59 @@ async def send_invoice(session: AsyncSession, invoice_id: UUID, to_email: str):
     inv.status = "sent"
     inv.sent_to_email = to_email
     inv.sent_at = datetime.utcnow()
-    out = EmailOutbox(type="invoice", to_email=to_email, subject=f"Invoice {inv.invoice_no}", body="Please find attached.", status="queued")
+    out = EmailOutbox(type="invoice", invoice_id=inv.id, to_email=to_email, subject=f"Invoice {inv.invoice_no}", body="Please find attached.", status="queued")
     session.add(out)
     await session.commit()
     return inv
 
 
-async def create_payment(session: AsyncSession, payload):
-    payment = Payment(client_id=payload.client_id, payment_date=payload.payment_date, amount=payload.amount, method=payload.method, reference=payload.reference, notes=payload.notes)
-    session.add(payment)
-    await session.flush()
-    allocated = Decimal("0")
-    for alloc in payload.allocations:
-        inv = await get_or_404(session, Invoice, alloc.invoice_id)
-        paid_sum = await session.scalar(select(func.coalesce(func.sum(PaymentAllocation.amount), 0)).where(PaymentAllocation.invoice_id == inv.id))
-        balance = inv.total - Decimal(str(paid_sum))
-        if alloc.amount > balance:
-            raise HTTPException(status_code=400, detail=f"Allocation exceeds balance for {inv.invoice_no}")
-        allocated += alloc.amount
-        session.add(PaymentAllocation(payment_id=payment.id, invoice_id=alloc.invoice_id, amount=alloc.amount))
-    if allocated > payload.amount:
-        raise HTTPException(status_code=400, detail="Allocations exceed payment amount")
-    await session.commit()
-    await session.refresh(payment)
-    return payment
-
-
-async def refresh_invoice_status(session: AsyncSession, invoice_id: UUID):
-    inv = await get_or_404(session, Invoice, invoice_id)
+def apply_invoice_status(inv: Invoice):
     if inv.status == "void":
         return
-    paid = await session.scalar(select(func.coalesce(func.sum(PaymentAllocation.amount), 0)).where(PaymentAllocation.invoice_id == invoice_id))
-    balance = inv.total - Decimal(str(paid))
-    if balance <= 0:
+    if inv.balance_due <= 0:
         inv.status = "paid"
-    elif balance < inv.total:
+    elif inv.amount_paid > 0:
         inv.status = "part_paid"
     elif inv.sent_at:
         inv.status = "sent"
     else:
         inv.status = "draft"
+
+
+async def lock_invoices(session: AsyncSession, invoice_ids) -> dict:
+    ids = sorted(set(invoice_ids))
+    if not ids:
+        return {}
+    # Lock in id order so concurrent payments touching overlapping invoices can't deadlock.
+    rows = await session.execute(select(Invoice).where(Invoice.id.in_(ids)).order_by(Invoice.id).with_for_update().execution_options(populate_existing=True))
+    invoices = {inv.id: inv for inv in rows.scalars()}
+    missing = [str(i) for i in ids if i not in invoices]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Invoice not found: {', '.join(missing)}")
+    return invoices
+
+
+async def create_payment(session: AsyncSession, payload):
+    invoice_ids = [a.invoice_id for a in payload.allocations]
+    if len(set(invoice_ids)) != len(invoice_ids):
+        raise HTTPException(status_code=400, detail="Duplicate invoice in allocations")
+    if sum([a.amount for a in payload.allocations], Decimal("0")) > payload.amount:
+        raise HTTPException(status_code=400, detail="Allocations exceed payment amount")
+    invoices = await lock_invoices(session, invoice_ids)
+    for alloc in payload.allocations:
+        inv = invoices[alloc.invoice_id]
+        if alloc.amount > inv.balance_due:
+            raise HTTPException(status_code=400, detail=f"Allocation exceeds balance for {inv.invoice_no}")
+    payment = Payment(client_id=payload.client_id, payment_date=payload.payment_date, amount=payload.amount, method=payload.method, reference=payload.reference, notes=payload.notes)
+    session.add(payment)
+    await session.flush()
+    if payload.allocations:
+        await session.execute(insert(PaymentAllocation), [{"payment_id": payment.id, "invoice_id": a.invoice_id, "amount": a.amount} for a in payload.allocations])
+    for alloc in payload.allocations:
+        inv = invoices[alloc.invoice_id]
+        inv.amount_paid += alloc.amount
+        inv.balance_due -= alloc.amount
+        apply_invoice_status(inv)
     await session.commit()
+    await session.refresh(payment)
+    return payment
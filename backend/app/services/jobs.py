@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.entities import Job, PayrollMonth
+from app.services.billing import fail_billing_run, run_billing
+from app.services.core import generate_payroll_items, recompute_payroll, stream_payroll_csv
+
+log = logging.getLogger("jobs")
+HANDLERS: dict = {}
+FAILURE_HOOKS: dict = {}
+_wakeup = asyncio.Event()
+
+
+def job_handler(kind: str, on_failure=None):
+    def register(fn):
+        HANDLERS[kind] = fn
+        if on_failure:
+            FAILURE_HOOKS[kind] = on_failure
+        return fn
+    return register
+
+
+def add_job(session: AsyncSession, kind: str, payload: dict) -> Job:
+    job = Job(id=uuid4(), kind=kind, status="queued", payload=jsonable_encoder(payload))
+    session.add(job)
+    return job
+
+
+def wake_workers():
+    _wakeup.set()
+
+
+async def enqueue_job(session: AsyncSession, kind: str, payload: dict) -> Job:
+    job = add_job(session, kind, payload)
+    await session.commit()
+    wake_workers()
+    return job
+
+
+async def claim_job(session: AsyncSession) -> Job | None:
+    # A running job whose lease lapsed belongs to a dead worker and is picked up again.
+    now = datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(or_(Job.status == "queued", and_(Job.status == "running", Job.locked_until < now)))
+        .order_by(Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id == due.scalar_subquery())
+        .values(status="running", attempts=Job.attempts + 1, started_at=now, locked_until=now + timedelta(seconds=settings.job_lease_seconds))
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    job = (await session.execute(stmt)).scalar_one_or_none()
+    await session.commit()
+    return job
+
+
+async def extend_lease(job_id: UUID, **values):
+    values["locked_until"] = datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds)
+    async with SessionLocal() as session:
+        await session.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(**values))
+        await session.commit()
+
+
+async def report_progress(job_id: UUID, done: int, total: int | None = None):
+    values = {"progress_done": done}
+    if total is not None:
+        values["progress_total"] = total
+    await extend_lease(job_id, **values)
+
+
+async def keep_leased(job_id: UUID):
+    # Payroll generate/recompute are single statements with no chunk boundary to report from, so the lease is renewed on a timer.
+    while True:
+        await asyncio.sleep(settings.job_lease_seconds / 3)
+        try:
+            await extend_lease(job_id)
+        except Exception:
+            log.exception("could not extend the lease on job %s", job_id)
+
+
+async def run_job(job: Job):
+    heartbeat = asyncio.create_task(keep_leased(job.id))
+    try:
+        if job.attempts > settings.job_max_attempts:
+            raise RuntimeError(f"Gave up after {job.attempts - 1} attempts")
+        result = await HANDLERS[job.kind](job, partial(report_progress, job.id))
+        values = {"status": "done", "result": jsonable_encoder(result)}
+    except Exception as exc:
+        log.exception("job %s (%s) failed", job.id, job.kind)
+        values = {"status": "failed", "error": str(exc) or exc.__class__.__name__}
+    finally:
+        heartbeat.cancel()
+    async with SessionLocal() as session:
+        await session.execute(update(Job).where(Job.id == job.id).values(finished_at=datetime.utcnow(), locked_until=None, **values))
+        if values["status"] == "failed" and job.kind in FAILURE_HOOKS:
+            await FAILURE_HOOKS[job.kind](session, job, values["error"])
+        await session.commit()
+
+
+async def run_worker(stop: asyncio.Event | None = None):
+    stop = stop or asyncio.Event()
+    while not stop.is_set():
+        try:
+            async with SessionLocal() as session:
+                job = await claim_job(session)
+            if job is not None:
+                await run_job(job)
+                continue
+        except Exception:
+            # A database outage must not kill the worker; back off and poll again.
+            log.exception("job worker iteration failed; retrying in %ss", settings.job_poll_seconds)
+            await asyncio.sleep(settings.job_poll_seconds)
+            continue
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.job_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+@job_handler("payroll.generate")
+async def generate_payroll_job(job: Job, progress):
+    async with SessionLocal() as session:
+        result = await generate_payroll_items(session, UUID(job.payload["month_id"]))
+    await progress(1, 1)
+    return result
+
+
+@job_handler("payroll.recompute")
+async def recompute_payroll_job(job: Job, progress):
+    async with SessionLocal() as session:
+        count = await recompute_payroll(session, UUID(job.payload["month_id"]), job.payload.get("full", False))
+    await progress(1, 1)
+    return {"items": count}
+
+
+@job_handler("payroll.export")
+async def export_payroll_job(job: Job, progress):
+    month_id = UUID(job.payload["month_id"])
+    async with SessionLocal() as session:
+        month = await session.scalar(select(PayrollMonth.month).where(PayrollMonth.id == month_id))
+    export_dir = Path(settings.export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    path = export_dir / f"{job.id}.csv"
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with tmp.open("w", newline="") as f:
+        async for chunk in stream_payroll_csv(month_id):
+            f.write(chunk)
+    os.replace(tmp, path)
+    await progress(1, 1)
+    return {"path": str(path), "filename": f"payroll-{month:%Y-%m}.csv"}
+
+
+async def billing_run_failed(session: AsyncSession, job: Job, error: str):
+    await fail_billing_run(session, UUID(job.payload["run_id"]), error)
+
+
+@job_handler("billing.run", on_failure=billing_run_failed)
+async def billing_run_job(job: Job, progress):
+    return await run_billing(UUID(job.payload["run_id"]), progress)
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from functools import partial
+from pathlib import Path
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.entities import EmailOutbox, Invoice
+from app.services.pdf import invoice_pdf_path
+
+log = logging.getLogger("outbox")
+
+
+class OutboxMetrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+
+    def record_batch(self, size: int, seconds: float):
+        self.batches += 1
+        self.last_batch_size = size
+        self.last_batch_seconds = seconds
+
+    def throughput(self) -> float:
+        return self.sent / max(time.monotonic() - self.started, 1e-9)
+
+    def render(self) -> str:
+        lines = [
+            "# TYPE outbox_sent_total counter", f"outbox_sent_total {self.sent}",
+            "# TYPE outbox_retried_total counter", f"outbox_retried_total {self.retried}",
+            "# TYPE outbox_failed_total counter", f"outbox_failed_total {self.failed}",
+            "# TYPE outbox_batches_total counter", f"outbox_batches_total {self.batches}",
+            "# TYPE outbox_last_batch_size gauge", f"outbox_last_batch_size {self.last_batch_size}",
+            "# TYPE outbox_last_batch_seconds gauge", f"outbox_last_batch_seconds {self.last_batch_seconds:.6f}",
+            "# TYPE outbox_sent_per_second gauge", f"outbox_sent_per_second {self.throughput():.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class SMTPPool:
+    """Keeps up to `size` SMTP connections open across batches; each send borrows one."""
+
+    def __init__(self, size: int):
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self.idle.put_nowait(None)
+
+    @classmethod
+    def connect(cls) -> smtplib.SMTP:
+        conn = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout_seconds)
+        try:
+            if settings.smtp_starttls:
+                conn.starttls()
+            if settings.smtp_user:
+                conn.login(settings.smtp_user, settings.smtp_password or "")
+        except Exception:
+            cls.discard(conn)
+            raise
+        return conn
+
+    @classmethod
+    def send_blocking(cls, conn: smtplib.SMTP | None, message: EmailMessage) -> smtplib.SMTP:
+        if conn is None:
+            conn = cls.connect()
+        try:
+            conn.send_message(message)
+            return conn
+        except smtplib.SMTPServerDisconnected:
+            cls.discard(conn)
+        # The pool only sees the connection it lent out, so a fresh one that fails here must be closed here.
+        fresh, sent = cls.connect(), False
+        try:
+            fresh.send_message(message)
+            sent = True
+        finally:
+            if not sent:
+                cls.discard(fresh)
+        return fresh
+
+    async def send(self, message: EmailMessage):
+        conn = await self.idle.get()
+        try:
+            conn = await asyncio.to_thread(self.send_blocking, conn, message)
+        except Exception:
+            conn = self.discard(conn)
+            raise
+        finally:
+            self.idle.put_nowait(conn)
+
+    @staticmethod
+    def discard(conn: smtplib.SMTP | None) -> None:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        return None
+
+    async def close(self):
+        while not self.idle.empty():
+            conn = self.idle.get_nowait()
+            if conn is not None:
+                try:
+                    await asyncio.to_thread(conn.quit)
+                except smtplib.SMTPException:
+                    self.discard(conn)
+
+
+async def claim_batch(session: AsyncSession, size: int) -> list[EmailOutbox]:
+    # Claimed rows get their next attempt pushed out by the lease, so a crashed worker's batch is retried later.
+    now = datetime.utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "queued", or_(EmailOutbox.next_attempt_at.is_(None), EmailOutbox.next_attempt_at <= now))
+        .order_by(EmailOutbox.created_at)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=settings.outbox_lease_seconds))
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await session.execute(stmt)).scalars().all()
+    await session.commit()
+    return list(rows)
+
+
+async def attach_invoice_pdf(session: AsyncSession, lock: asyncio.Lock, row: EmailOutbox):
+    if row.type != "invoice" or not row.invoice_id or row.attachment_path:
+        return
+    # Every delivery in a batch shares the batch session, which only takes one operation at a time.
+    async with lock:
+        inv = await session.get(Invoice, row.invoice_id)
+        row.attachment_path = str(await invoice_pdf_path(session, inv))
+
+
+def build_message(row: EmailOutbox) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = settings.smtp_from or settings.smtp_user or "no-reply@localhost"
+    msg["To"] = row.to_email
+    msg["Subject"] = row.subject
+    msg.set_content(row.body)
+    if row.attachment_path:
+        path = Path(row.attachment_path)
+        msg.add_attachment(path.read_bytes(), maintype="application", subtype="pdf" if path.suffix == ".pdf" else "octet-stream", filename=path.name)
+    return msg
+
+
+def backoff_seconds(attempts: int) -> int:
+    return settings.outbox_backoff_seconds * 2 ** (attempts - 1)
+
+
+async def deliver(pool: SMTPPool, row: EmailOutbox, prepare) -> dict:
+    # A PDF that fails to render is a failed attempt like an SMTP error, so it backs off and ends in failed instead of stalling the batch.
+    result = {"id": row.id, "attempts": row.attempts + 1, "next_attempt_at": None, "sent_at": None, "error": None}
+    try:
+        await prepare(row)
+        await pool.send(build_message(row))
+        result.update(status="sent", sent_at=datetime.utcnow())
+    except Exception as exc:
+        result["error"] = str(exc)
+        if result["attempts"] >= settings.outbox_max_attempts:
+            result["status"] = "failed"
+        else:
+            result.update(status="queued", next_attempt_at=datetime.utcnow() + timedelta(seconds=backoff_seconds(result["attempts"])))
+    return {**result, "attachment_path": row.attachment_path}
+
+
+async def process_batch(pool: SMTPPool, metrics: OutboxMetrics) -> int:
+    started = time.monotonic()
+    async with SessionLocal() as session:
+        rows = await claim_batch(session, settings.outbox_batch_size)
+        if not rows:
+            return 0
+        prepare = partial(attach_invoice_pdf, session, asyncio.Lock())
+        results = await asyncio.gather(*(deliver(pool, r, prepare) for r in rows))
+        await session.execute(update(EmailOutbox), results)
+        await session.commit()
+    metrics.sent += sum(r["status"] == "sent" for r in results)
+    metrics.retried += sum(r["status"] == "queued" for r in results)
+    metrics.failed += sum(r["status"] == "failed" for r in results)
+    metrics.record_batch(len(rows), time.monotonic() - started)
+    log.info("outbox batch: %d messages in %.2fs (%.1f sent/s overall)", len(rows), metrics.last_batch_seconds, metrics.throughput())
+    return len(rows)
+
+
+async def serve_metrics(metrics: OutboxMetrics, port: int):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await reader.readline()
+        body = metrics.render().encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "0.0.0.0", port)
+
+
+async def run_worker(stop: asyncio.Event | None = None, metrics: OutboxMetrics | None = None):
+    if not settings.smtp_host:
+        # Without a server every claimed message would just burn through its attempts; leave the queue untouched.
+        raise RuntimeError("SMTP_HOST is not set; the outbox worker has nowhere to deliver")
+    stop = stop or asyncio.Event()
+    metrics = metrics or OutboxMetrics()
+    pool = SMTPPool(settings.outbox_concurrency)
+    server = await serve_metrics(metrics, settings.outbox_metrics_port) if settings.outbox_metrics_port else None
+    try:
+        while not stop.is_set():
+            try:
+                full = await process_batch(pool, metrics) >= settings.outbox_batch_size
+            except Exception:
+                # A database blip must not end the worker; claimed rows are retried once their lease lapses.
+                log.exception("outbox batch failed")
+                full = False
+            if not full:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=settings.outbox_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        await pool.close()
+        if server:
+            server.close()
+            await server.wait_closed()
+    return metrics
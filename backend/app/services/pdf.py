@@ -0,0 +1,98 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.entities import Client, Invoice, InvoiceItem
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def render_invoice_pdf(data: dict) -> bytes:
+    buf = io.BytesIO()
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(buf, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm, title=f"Invoice {data['invoice_no']}")
+
+    def money(value) -> str:
+        return f"{data['currency']} {value:,.2f}"
+
+    header = [
+        Paragraph(settings.app_name, styles["Title"]),
+        Paragraph(f"Invoice <b>{data['invoice_no']}</b>", styles["Heading2"]),
+        Paragraph(f"Bill to: {escape(data['client_name'] or '')}", styles["Normal"]),
+        Paragraph(f"Issue date: {data['issue_date']:%d %b %Y} &nbsp;&nbsp; Due date: {data['due_date']:%d %b %Y}", styles["Normal"]),
+        Spacer(1, 8 * mm),
+    ]
+    rows = [["Description", "Qty", "Unit price", "Amount"]]
+    rows += [[Paragraph(escape(i["description"]), styles["Normal"]), f"{i['quantity']:,.2f}", money(i["unit_price"]), money(i["amount"])] for i in data["items"]]
+    rows += [
+        ["", "", "Subtotal", money(data["subtotal"])],
+        ["", "", "Tax", money(data["tax_total"])],
+        ["", "", "Total", money(data["total"])],
+        ["", "", "Paid", money(data["amount_paid"])],
+        ["", "", "Balance due", money(data["balance_due"])],
+    ]
+    table = Table(rows, colWidths=[90 * mm, 18 * mm, 32 * mm, 34 * mm], repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LINEBELOW", (0, 0), (-1, len(data["items"])), 0.25, colors.grey),
+        ("FONTNAME", (2, -1), (-1, -1), "Helvetica-Bold"),
+    ]))
+    story = [*header, table]
+    if data["notes"]:
+        story += [Spacer(1, 6 * mm), Paragraph(escape(data["notes"]), styles["Normal"])]
+    doc.build(story)
+    return buf.getvalue()
+
+
+def pdf_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked so workers don't inherit the event loop, DB connections or listening sockets.
+        _pool = ProcessPoolExecutor(max_workers=settings.pdf_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def invoice_pdf_path(session: AsyncSession, inv: Invoice) -> Path:
+    # The PDF shows the client's name, so a client edit invalidates it as well as an invoice edit.
+    client_name, client_updated_at = (await session.execute(select(Client.name, Client.updated_at).where(Client.id == inv.client_id))).one()
+    version = round(max(d.timestamp() for d in (inv.updated_at, client_updated_at) if d) * 1_000_000) * 1000
+    # One file per invoice, stamped with the version as its mtime and swapped in with os.replace, so a download in flight never loses its file.
+    path = Path(settings.pdf_cache_dir) / f"{inv.id}.pdf"
+    if path.exists() and path.stat().st_mtime_ns == version:
+        return path
+    items = (await session.execute(select(InvoiceItem).where(InvoiceItem.invoice_id == inv.id).order_by(InvoiceItem.created_at))).scalars().all()
+    data = {
+        **{k: getattr(inv, k) for k in ("invoice_no", "issue_date", "due_date", "currency", "subtotal", "tax_total", "total", "amount_paid", "balance_due", "notes")},
+        "client_name": client_name,
+        "items": [{"description": i.description, "quantity": i.quantity, "unit_price": i.unit_price, "amount": i.amount} for i in items],
+    }
+    content = await asyncio.get_running_loop().run_in_executor(pdf_pool(), render_invoice_pdf, data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{id(content)}.tmp")
+    tmp.write_bytes(content)
+    os.utime(tmp, ns=(version, version))
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,188 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import Numeric, String, and_, case, cast, event, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import ReadSessionLocal
+from app.models.entities import Asset, AssetIssuance, Client, Guard, Invoice, Payment, PaymentAllocation, PayrollMonth, Site
+from app.services.core import csv_chunk
+
+DASHBOARD_MODELS = (Guard, Client, Site, Asset, AssetIssuance, Invoice, PaymentAllocation, PayrollMonth)
+_dashboard_cache: dict = {"value": None, "expires": 0.0, "generation": 0}
+
+
+def invalidate_dashboard():
+    _dashboard_cache["value"] = None
+    _dashboard_cache["generation"] += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session, flush_context):
+    if any(isinstance(obj, DASHBOARD_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        invalidate_dashboard()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_write(orm_execute_state):
+    state = orm_execute_state
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper and state.bind_mapper.class_ in DASHBOARD_MODELS:
+        invalidate_dashboard()
+
+
+async def dashboard_summary(session: AsyncSession):
+    cached = _dashboard_cache["value"]
+    if cached is not None and _dashboard_cache["expires"] > time.monotonic():
+        return cached
+    generation = _dashboard_cache["generation"]
+
+    by_status = union_all(
+        *[select(literal(name).label("entity"), cast(model.status, String).label("status"), func.count()).group_by(model.status) for name, model in (("guards", Guard), ("clients", Client), ("sites", Site), ("assets", Asset))]
+    )
+    counts: dict = {"guards": {}, "clients": {}, "sites": {}, "assets": {}}
+    for entity, status, count in await session.execute(by_status):
+        counts[entity][status] = count
+
+    outstanding = select(func.coalesce(func.sum(Invoice.balance_due), 0)).where(Invoice.status.in_(["sent", "part_paid"])).scalar_subquery()
+    open_issuances = select(func.count()).select_from(AssetIssuance).where(AssetIssuance.status == "issued").scalar_subquery()
+    totals = (await session.execute(select(open_issuances, outstanding))).one()
+    month = await session.scalar(select(PayrollMonth).order_by(PayrollMonth.month.desc()).limit(1))
+
+    summary = {
+        **counts,
+        "open_issuances": totals[0],
+        "outstanding_receivables": totals[1],
+        "payroll_month": {"id": month.id, "month": month.month, "status": month.status} if month else None,
+    }
+    if _dashboard_cache["generation"] == generation:
+        _dashboard_cache.update(value=summary, expires=time.monotonic() + settings.dashboard_cache_seconds)
+    return summary
+
+
+STATEMENT_CSV_COLUMNS = ["date", "type", "ref", "debit", "credit", "balance"]
+
+
+def statement_query(client_id: UUID, from_: date, to: date):
+    money = Numeric(12, 2)
+    zero = literal(Decimal("0"), money)
+    live_invoices = and_(Invoice.client_id == client_id, Invoice.status != "void")
+    invoiced_before = select(func.coalesce(func.sum(Invoice.total), 0)).where(live_invoices, Invoice.issue_date < from_).scalar_subquery()
+    paid_before = select(func.coalesce(func.sum(Payment.amount), 0)).where(Payment.client_id == client_id, Payment.payment_date < from_).scalar_subquery()
+    entries = union_all(
+        select(
+            literal(from_).label("entry_date"), literal(0).label("seq"), literal("opening").label("entry_type"), literal("").label("ref"),
+            literal(None, Client.id.type).label("entity_id"), cast(Client.opening_balance + invoiced_before - paid_before, money).label("debit"), zero.label("credit"),
+        ).where(Client.id == client_id),
+        select(
+            Invoice.issue_date, literal(1), literal("invoice"), Invoice.invoice_no, Invoice.id, Invoice.total, zero,
+        ).where(live_invoices, Invoice.issue_date >= from_, Invoice.issue_date <= to),
+        select(
+            Payment.payment_date, literal(2), literal("payment"), func.coalesce(Payment.reference, cast(Payment.id, String)), Payment.id, zero, Payment.amount,
+        ).where(Payment.client_id == client_id, Payment.payment_date >= from_, Payment.payment_date <= to),
+    ).subquery()
+    order = (entries.c.entry_date, entries.c.seq, entries.c.ref, entries.c.entity_id)
+    return select(
+        entries.c.entry_date, entries.c.entry_type, entries.c.ref, entries.c.entity_id, entries.c.debit, entries.c.credit,
+        func.sum(entries.c.debit - entries.c.credit).over(order_by=order, rows=(None, 0)).label("balance"),
+    ).order_by(*order)
+
+
+async def client_statement(session: AsyncSession, client_id: UUID, from_: date, to: date) -> dict:
+    rows = (await session.execute(statement_query(client_id, from_, to))).all()
+    opening, entries = rows[0], rows[1:]
+    return {
+        "opening_balance": opening.balance,
+        "closing_balance": rows[-1].balance,
+        "entries": [{"date": r.entry_date, "type": r.entry_type, "ref": r.ref, "debit": r.debit, "credit": r.credit, "balance": r.balance} for r in entries],
+        "invoices": [{"invoice_no": r.ref, "total": r.debit} for r in entries if r.entry_type == "invoice"],
+        "payments": [{"id": str(r.entity_id), "amount": r.credit} for r in entries if r.entry_type == "payment"],
+    }
+
+
+async def stream_statement_csv(client_id: UUID, from_: date, to: date, chunk_size: int = 1000):
+    yield csv_chunk([STATEMENT_CSV_COLUMNS])
+    closing = None
+    async with ReadSessionLocal() as session:
+        result = await session.stream(statement_query(client_id, from_, to).execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            closing = rows[-1].balance
+            yield csv_chunk([(r.entry_date, r.entry_type, r.ref, r.debit, r.credit, r.balance) for r in rows])
+    yield csv_chunk([(to, "closing", "", "", "", closing)])
+
+
+AGING_BUCKETS = ["current", "1_30", "31_60", "61_90", "90_plus"]
+
+
+def aging_query(as_of: date):
+    if as_of >= date.today():
+        # Current balances are materialised on the invoice; only a historical as_of needs the allocation rollup.
+        paid, balance = None, Invoice.balance_due
+    else:
+        paid = (
+            select(PaymentAllocation.invoice_id, func.sum(PaymentAllocation.amount).label("amount"))
+            .join(Payment, Payment.id == PaymentAllocation.payment_id)
+            .where(Payment.payment_date <= as_of)
+            .group_by(PaymentAllocation.invoice_id)
+            .subquery()
+        )
+        balance = Invoice.total - func.coalesce(paid.c.amount, 0)
+    bucket = case(
+        (Invoice.due_date >= as_of, "current"),
+        (Invoice.due_date >= as_of - timedelta(days=30), "1_30"),
+        (Invoice.due_date >= as_of - timedelta(days=60), "31_60"),
+        (Invoice.due_date >= as_of - timedelta(days=90), "61_90"),
+        else_="90_plus",
+    )
+    stmt = (
+        select(Client.id, Client.name, bucket.label("bucket"), func.sum(balance))
+        .join(Client, Client.id == Invoice.client_id)
+        .where(Invoice.status.in_(["sent", "part_paid", "paid"]), Invoice.issue_date <= as_of, balance > 0)
+        .group_by(Client.id, Client.name, bucket)
+        .order_by(Client.name, Client.id)
+    )
+    return stmt.outerjoin(paid, paid.c.invoice_id == Invoice.id) if paid is not None else stmt
+
+
+def aging_row(client_id, name) -> dict:
+    return {"client_id": client_id, "client_name": name, **dict.fromkeys([*AGING_BUCKETS, "total"], Decimal("0.00"))}
+
+
+def add_aging(row: dict, totals: dict, bucket: str, amount: Decimal):
+    for target in (row, totals):
+        target[bucket] += amount
+        target["total"] += amount
+
+
+async def aging_report(session: AsyncSession, as_of: date) -> dict:
+    clients: dict = {}
+    totals = dict.fromkeys([*AGING_BUCKETS, "total"], Decimal("0.00"))
+    for client_id, name, bucket, amount in await session.execute(aging_query(as_of)):
+        add_aging(clients.setdefault(client_id, aging_row(client_id, name)), totals, bucket, amount)
+    return {"as_of": as_of, "buckets": AGING_BUCKETS, "clients": list(clients.values()), "totals": totals}
+
+
+async def stream_aging_csv(as_of: date, chunk_size: int = 1000):
+    # Rows arrive ordered by client, so each client's row is complete once the next client starts.
+    columns = ["client_id", "client_name", *AGING_BUCKETS, "total"]
+    yield csv_chunk([columns])
+    totals = dict.fromkeys([*AGING_BUCKETS, "total"], Decimal("0.00"))
+    current = None
+    async with ReadSessionLocal() as session:
+        result = await session.stream(aging_query(as_of).execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            finished = []
+            for client_id, name, bucket, amount in rows:
+                if current is None or current["client_id"] != client_id:
+                    if current is not None:
+                        finished.append(current)
+                    current = aging_row(client_id, name)
+                add_aging(current, totals, bucket, amount)
+            if finished:
+                yield csv_chunk([[row[c] for c in columns] for row in finished])
+    if current is not None:
+        yield csv_chunk([[current[c] for c in columns]])
+    yield csv_chunk([["", "TOTAL", *[totals[c] for c in columns[2:]]]])
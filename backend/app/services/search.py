@@ -0,0 +1,81 @@
+import re
+from collections import defaultdict
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.entities import Asset, Client, Guard, Site
+
+SEARCH_COLUMNS = {
+    Client: Client.name,
+    Site: Site.name,
+    Guard: Guard.full_name,
+    Asset: Asset.asset_tag,
+}
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text: str) -> set[str]:
+    grams = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-process stand-in for a pg_trgm GIN index, used when the database is not Postgres."""
+
+    def __init__(self):
+        self.docs: dict = {}
+        self.postings: dict[str, set] = defaultdict(set)
+
+    def add(self, doc_id, text: str):
+        self.docs[doc_id] = (text.lower(), trigrams(text))
+        for gram in self.docs[doc_id][1]:
+            self.postings[gram].add(doc_id)
+
+    def search(self, q: str, limit: int) -> list[tuple]:
+        needle, grams = q.lower(), trigrams(q)
+        candidates = set().union(*(self.postings.get(g, ()) for g in grams)) if grams else set(self.docs)
+        hits = []
+        for doc_id in candidates:
+            text, doc_grams = self.docs[doc_id]
+            score = len(grams & doc_grams) / len(grams | doc_grams) if grams else 0.0
+            if needle in text or score >= SIMILARITY_THRESHOLD:
+                hits.append((doc_id, score))
+        hits.sort(key=lambda h: (-h[1], self.docs[h[0]][0]))
+        return hits[:limit]
+
+
+_fallback_indexes: dict = {}
+
+
+async def _fallback_index(session: AsyncSession, model) -> TrigramIndex:
+    col = SEARCH_COLUMNS[model]
+    stamp = tuple((await session.execute(select(func.count(), func.max(model.updated_at)))).one())
+    cached = _fallback_indexes.get(model)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    index = TrigramIndex()
+    for doc_id, text in await session.execute(select(model.id, col)):
+        index.add(doc_id, text or "")
+    _fallback_indexes[model] = (stamp, index)
+    return index
+
+
+def escape_like(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_entities(session: AsyncSession, model, q: str, limit: int = 20):
+    col = SEARCH_COLUMNS[model]
+    if session.bind.dialect.name == "postgresql":
+        score = func.similarity(col, q)
+        stmt = select(model).where(or_(col.ilike(f"%{escape_like(q)}%", escape="\\"), col.op("%")(q))).order_by(score.desc(), col).limit(limit)
+        return (await session.execute(stmt)).scalars().all()
+    hits = (await _fallback_index(session, model)).search(q, limit)
+    if not hits:
+        return []
+    rows = {r.id: r for r in (await session.execute(select(model).where(model.id.in_([h[0] for h in hits])))).scalars()}
+    return [rows[doc_id] for doc_id, _ in hits if doc_id in rows]
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select
+
+from app.db.session import SessionLocal
+from app.models.entities import Asset, AssetIssuance, Client, Guard, Invoice, InvoiceItem, Payment, PaymentAllocation, Site
+
+BATCH_SIZE = 5000
+ASSET_TYPES = ["gun", "uniform", "radio", "torch", "baton", "handcuffs"]
+CONDITIONS = ["new", "good", "fair"]
+
+
+def money(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def batched(rows, size: int = BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+async def load(model, rows) -> int:
+    # Core executemany: asyncpg pipelines each batch, and no ORM objects are built.
+    count, started = 0, time.perf_counter()
+    async with SessionLocal() as session:
+        for batch in batched(rows):
+            await session.execute(insert(model), batch)
+            await session.commit()
+            count += len(batch)
+    print(f"{model.__tablename__:<20} {count:>9} rows in {time.perf_counter() - started:7.1f}s")
+    return count
+
+
+def clients(ids: list, now: datetime):
+    for i, client_id in enumerate(ids):
+        yield {"id": client_id, "name": f"Bench Client {i:05d}", "billing_email": f"billing{i}@bench.test", "billing_cycle": "quarterly" if i % 10 == 0 else "monthly", "opening_balance": Decimal("0"), "status": "active", "created_at": now, "updated_at": now}
+
+
+def sites(ids: list, client_ids: list, rng: random.Random, now: datetime):
+    for i, site_id in enumerate(ids):
+        yield {
+            "id": site_id, "client_id": client_ids[i % len(client_ids)], "name": f"Site {i:05d}", "region": rng.choice(["Dar", "Arusha", "Mwanza", "Dodoma"]),
+            "status": "active", "billing_rate_monthly": money(rng.uniform(500_000, 5_000_000)), "required_guards_day": rng.randint(1, 6), "required_guards_night": rng.randint(1, 6),
+            "created_at": now, "updated_at": now,
+        }
+
+
+def guards(ids: list, rng: random.Random, now: datetime):
+    for i, guard_id in enumerate(ids):
+        yield {
+            "id": guard_id, "guard_no": f"BG-{i:06d}", "full_name": f"Bench Guard {i:06d}", "hire_date": date(2020, 1, 1) + timedelta(days=rng.randint(0, 1800)),
+            "status": "active" if rng.random() < 0.95 else "on_leave", "base_salary_monthly": money(rng.uniform(300_000, 900_000)),
+            "housing_allowance_monthly": money(rng.uniform(0, 100_000)), "transport_allowance_monthly": money(rng.uniform(0, 50_000)), "other_allowance_monthly": Decimal("0"),
+            "created_at": now, "updated_at": now,
+        }
+
+
+def assets(ids: list, open_assets: set, rng: random.Random, now: datetime):
+    for i, asset_id in enumerate(ids):
+        yield {
+            "id": asset_id, "asset_tag": f"BA-{i:06d}", "type": ASSET_TYPES[i % len(ASSET_TYPES)], "condition": rng.choice(CONDITIONS),
+            "status": "issued" if asset_id in open_assets else "available", "created_at": now, "updated_at": now,
+        }
+
+
+def issuances(count: int, asset_ids: list, open_assets: set, guard_ids: list, rng: random.Random, now: datetime):
+    # Older issuances are returned history; the last one for each open asset stays issued.
+    history = count - len(open_assets)
+    for i in range(history):
+        issued_at = now - timedelta(days=rng.randint(1, 720), hours=rng.randint(0, 23))
+        yield {
+            "id": uuid4(), "asset_id": asset_ids[i % len(asset_ids)], "guard_id": rng.choice(guard_ids), "issued_at": issued_at, "returned_at": issued_at + timedelta(hours=12),
+            "issue_condition": "good", "return_condition": "good", "status": "returned", "created_at": issued_at,
+        }
+    for asset_id in open_assets:
+        yield {
+            "id": uuid4(), "asset_id": asset_id, "guard_id": rng.choice(guard_ids), "issued_at": now, "returned_at": None,
+            "issue_condition": "good", "return_condition": None, "status": "issued", "created_at": now,
+        }
+
+
+def receivables(count: int, allocations: int, client_ids: list, rng: random.Random, today: date):
+    """Yields (invoice, item, [(payment, allocation), ...]) with balances that agree with the allocations."""
+    per_invoice = allocations / max(count, 1)
+    for i in range(count):
+        issue_date = today - timedelta(days=rng.randint(0, 730))
+        client_id = rng.choice(client_ids)
+        total = money(rng.uniform(200_000, 20_000_000))
+        paid_parts = int(per_invoice) + (rng.random() < per_invoice - int(per_invoice))
+        settled = issue_date < today - timedelta(days=90) or rng.random() < 0.5
+        payments, paid = [], Decimal("0")
+        for n in range(paid_parts):
+            amount = (total / paid_parts).quantize(Decimal("0.01")) if settled else (total / (paid_parts + 1)).quantize(Decimal("0.01"))
+            if settled and n == paid_parts - 1:
+                amount = total - paid
+            payment_id = uuid4()
+            payment_date = issue_date + timedelta(days=rng.randint(1, 60))
+            stamp = datetime.combine(payment_date, datetime.min.time())
+            payments.append((
+                {"id": payment_id, "client_id": client_id, "payment_date": payment_date, "amount": amount, "method": "bank", "reference": f"BENCH-{i}-{n}", "created_at": stamp, "updated_at": stamp},
+                {"id": uuid4(), "payment_id": payment_id, "invoice_id": None, "amount": amount, "created_at": stamp},
+            ))
+            paid += amount
+        status = "paid" if paid >= total else "part_paid" if paid else "sent"
+        invoice_id = uuid4()
+        stamp = datetime.combine(issue_date, datetime.min.time())
+        invoice = {
+            "id": invoice_id, "client_id": client_id, "invoice_no": f"BENCH-{i:07d}", "issue_date": issue_date, "due_date": issue_date + timedelta(days=30),
+            "currency": "TZS", "status": status, "subtotal": total, "tax_total": Decimal("0"), "total": total, "amount_paid": paid, "balance_due": total - paid,
+            "created_at": stamp, "updated_at": stamp,
+        }
+        item = {"id": uuid4(), "invoice_id": invoice_id, "description": f"Guarding services {issue_date:%B %Y}", "quantity": Decimal("1"), "unit_price": total, "amount": total, "created_at": stamp}
+        for _, allocation in payments:
+            allocation["invoice_id"] = invoice_id
+        yield invoice, item, payments
+
+
+async def load_receivables(args, client_ids: list, rng: random.Random):
+    started = time.perf_counter()
+    totals = {"invoices": 0, "allocations": 0}
+    for chunk in batched(receivables(args.invoices, args.allocations, client_ids, rng, date.today())):
+        async with SessionLocal() as session:
+            await session.execute(insert(Invoice), [invoice for invoice, _, _ in chunk])
+            await session.execute(insert(InvoiceItem), [item for _, item, _ in chunk])
+            pairs = [pair for _, _, payments in chunk for pair in payments]
+            for batch in batched(pairs):
+                await session.execute(insert(Payment), [payment for payment, _ in batch])
+                await session.execute(insert(PaymentAllocation), [allocation for _, allocation in batch])
+            await session.commit()
+        totals["invoices"] += len(chunk)
+        totals["allocations"] += len(pairs)
+    print(f"{'invoices':<20} {totals['invoices']:>9} rows, {totals['allocations']} allocations in {time.perf_counter() - started:7.1f}s")
+
+
+async def generate(args):
+    async with SessionLocal() as session:
+        if await session.scalar(select(func.count()).select_from(Client).where(Client.name.like("Bench Client %"))):
+            raise SystemExit("Benchmark data already present; use a fresh database")
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    client_ids = [uuid4() for _ in range(args.clients)]
+    guard_ids = [uuid4() for _ in range(args.guards)]
+    asset_ids = [uuid4() for _ in range(args.assets)]
+    open_assets = set(asset_ids[: min(args.assets, args.issuances) // 10])
+    await load(Client, clients(client_ids, now))
+    await load(Site, sites([uuid4() for _ in range(args.sites)], client_ids, rng, now))
+    await load(Guard, guards(guard_ids, rng, now))
+    await load(Asset, assets(asset_ids, open_assets, rng, now))
+    await load(AssetIssuance, issuances(args.issuances, asset_ids, open_assets, guard_ids, rng, now))
+    await load_receivables(args, client_ids, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the configured database with synthetic benchmark data.")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--sites", type=int, default=2_000)
+    parser.add_argument("--guards", type=int, default=5_000)
+    parser.add_argument("--assets", type=int, default=20_000)
+    parser.add_argument("--issuances", type=int, default=100_000)
+    parser.add_argument("--invoices", type=int, default=500_000)
+    parser.add_argument("--allocations", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(generate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import subprocess
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.main import app
+from app.models.entities import Client, Guard, Invoice, PayrollMonth
+
+RESULTS = Path(__file__).with_name("results.jsonl")
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+BENCH_MONTH = date(2099, 1, 1)
+
+
+async def fixtures(client: httpx.AsyncClient) -> dict:
+    async with SessionLocal() as session:
+        busiest = (await session.execute(
+            select(Invoice.client_id).group_by(Invoice.client_id).order_by(func.count().desc()).limit(1)
+        )).scalar_one()
+        invoice_id = await session.scalar(select(Invoice.id).where(Invoice.client_id == busiest).order_by(Invoice.issue_date.desc()).limit(1))
+        open_invoices = (await session.scalars(
+            select(Invoice.id).where(Invoice.client_id == busiest, Invoice.status.in_(["sent", "part_paid"]), Invoice.balance_due > 0).limit(200)
+        )).all()
+        guard_name = await session.scalar(select(Guard.full_name).order_by(Guard.created_at).limit(1))
+        month_id = await session.scalar(select(PayrollMonth.id).where(PayrollMonth.month == BENCH_MONTH))
+        client_name = await session.scalar(select(Client.name).where(Client.id == busiest))
+    if month_id is None:
+        month_id = (await client.post("/payroll-months", json={"month": str(BENCH_MONTH)})).json()["id"]
+    return {"client_id": str(busiest), "client_name": client_name, "invoice_id": str(invoice_id), "open_invoices": [str(i) for i in open_invoices], "guard_q": guard_name.split()[-1], "month_id": str(month_id)}
+
+
+def scenarios(f: dict) -> dict:
+    today = date.today()
+    payments = iter(f["open_invoices"])
+
+    def payment():
+        invoice_id = next(payments)
+        return {"client_id": f["client_id"], "payment_date": str(today), "amount": "1.00", "method": "bank", "reference": f"bench-{time.time_ns()}", "allocations": [{"invoice_id": invoice_id, "amount": "1.00"}]}
+
+    return {
+        "list_clients": ("GET", "/clients", {"params": {"limit": 50}}),
+        "list_guards_page": ("GET", "/guards", {"params": {"limit": 200}}),
+        "list_invoices": ("GET", "/invoices", {"params": {"limit": 100}}),
+        "list_invoices_client_status": ("GET", "/invoices", {"params": {"client_id": f["client_id"], "status": "sent", "limit": 100}}),
+        "invoice_summaries": ("GET", "/invoices/summaries", {"params": {"limit": 100}}),
+        "invoice_detail": ("GET", f"/invoices/{f['invoice_id']}", {}),
+        "list_payments_client": ("GET", "/payments", {"params": {"client_id": f["client_id"], "limit": 100}}),
+        "search_guards": ("GET", "/guards/search", {"params": {"q": f["guard_q"]}}),
+        "dashboard": ("GET", "/dashboard/summary", {}),
+        "statement_json": ("GET", f"/clients/{f['client_id']}/statement", {"params": {"from": str(today.replace(year=today.year - 1)), "to": str(today)}}),
+        "statement_csv": ("GET", f"/clients/{f['client_id']}/statement", {"params": {"from": str(today.replace(year=today.year - 2)), "to": str(today), "format": "csv"}}),
+        "aging_report": ("GET", "/reports/aging", {}),
+        "payroll_generate": ("POST", f"/payroll-months/{f['month_id']}/generate-items", {}),
+        "payroll_recompute_full": ("POST", f"/payroll-months/{f['month_id']}/recompute", {"params": {"full": True}}),
+        "payroll_export_csv": ("GET", f"/payroll-months/{f['month_id']}/export.csv", {}),
+        "payment_post": ("POST", "/payments", {"json": payment}),
+    }
+
+
+async def measure(client: httpx.AsyncClient, method: str, url: str, options: dict, runs: int) -> dict:
+    timings, queries, db_ms = [], [], []
+    for _ in range(runs):
+        kwargs = {k: v() if callable(v) else v for k, v in options.items()}
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        if match := SERVER_TIMING.search(response.headers.get("server-timing", "")):
+            db_ms.append(float(match[1]))
+            queries.append(int(match[2]))
+    timings.sort()
+    return {
+        "runs": runs,
+        "min_ms": round(timings[0], 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+        "queries": max(queries) if queries else None,
+        "db_ms": round(statistics.median(db_ms), 2) if db_ms else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_run() -> dict:
+    if not RESULTS.exists():
+        return {}
+    lines = RESULTS.read_text().strip().splitlines()
+    return json.loads(lines[-1])["results"] if lines else {}
+
+
+async def run(args):
+    settings.server_timing = True
+    previous = previous_run()
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        f = await fixtures(client)
+        for name, (method, url, options) in scenarios(f).items():
+            if args.only and name not in args.only:
+                continue
+            runs = 1 if method == "POST" and name.startswith("payroll") else args.runs
+            if name == "payment_post":
+                runs = min(runs, len(f["open_invoices"]))
+            results[name] = await measure(client, method, url, options, runs)
+            before = previous.get(name, {}).get("median_ms")
+            change = f"{(results[name]['median_ms'] - before) / before:+7.1%}" if before else ""
+            print(f"{name:<30} median {results[name]['median_ms']:>9.2f} ms  p95 {results[name]['p95_ms']:>9.2f} ms  queries {results[name]['queries']!s:>4}  {change}")
+    if not args.no_save:
+        with RESULTS.open("a") as out:
+            out.write(json.dumps({"revision": git_revision(), "recorded_at": datetime.utcnow().isoformat(timespec="seconds"), "results": results}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the key API endpoints against the configured database.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    parser.add_argument("--no-save", action="store_true", help=f"Don't append results to {RESULTS.name}")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
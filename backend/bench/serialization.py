@@ -0,0 +1,66 @@
+import argparse
+import json
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+from asyncpg.pgproto.pgproto import UUID
+from fastapi.responses import JSONResponse as StdJSONResponse
+from pydantic import TypeAdapter
+
+from app.api.responses import JSONResponse
+from app.schemas.common import ListResponse
+from app.schemas.entities import InvoiceRead
+
+FIELDS = list(InvoiceRead.model_fields)
+
+
+def rows(count: int) -> list[tuple]:
+    # asyncpg's UUID subclass, as real rows carry, not the stdlib type.
+    today = date.today()
+    return [
+        (UUID(str(uuid4())), UUID(str(uuid4())), f"INV-2026-{i:06d}", today - timedelta(days=i % 700), today - timedelta(days=i % 700 - 30), "sent",
+         Decimal("1500000.00"), Decimal("0.00"), Decimal("1500000.00"), Decimal("250000.00"), Decimal("1250000.00"))
+        for i in range(count)
+    ]
+
+
+def orm_path(data: list[tuple]) -> bytes:
+    # What a response_model list route does: ORM-like objects validated and dumped through Pydantic, then encoded.
+    objects = [SimpleNamespace(**dict(zip(FIELDS, r)), created_at=datetime.now(timezone.utc)) for r in data]
+    adapter = TypeAdapter(ListResponse[InvoiceRead])
+    content = adapter.dump_python(adapter.validate_python({"items": objects, "total": len(objects)}, from_attributes=True), mode="json")
+    return StdJSONResponse(content).body
+
+
+def tuple_path(data: list[tuple]) -> bytes:
+    return JSONResponse({"items": [dict(zip(FIELDS, r)) for r in data], "total": len(data), "next_cursor": None}).body
+
+
+def timed(fn, data, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-response serialisation paths without a database.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    data = rows(args.rows)
+    if json.loads(orm_path(data[:100])) != json.loads(tuple_path(data[:100])):
+        raise SystemExit("Serialisation paths disagree")
+    baseline = statistics.median(timed(orm_path, data, args.repeat))
+    fast = statistics.median(timed(tuple_path, data, args.repeat))
+    print(f"{args.rows} invoice rows: pydantic + json {baseline:8.1f} ms | tuples + orjson {fast:8.1f} ms | {baseline / fast:4.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
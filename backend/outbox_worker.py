@@ -0,0 +1,9 @@
+import asyncio
+import logging
+
+from app.services.outbox import run_worker
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
@@ -0,0 +1,40 @@
+import os
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+# Engines are built from settings at import time, so the test database has to be chosen before the app is imported.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["DATABASE_READ_URL"] = ""
+os.environ["JOB_WORKER_IN_PROCESS"] = "false"
+
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.base import Base  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+async def database():
+    # Postgres-only behaviour (SKIP LOCKED, partial indexes, EXPLAIN) is what these tests are for, so there is no sqlite fallback.
+    if not TEST_DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to a disposable Postgres database")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(database):
+    async with database.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {', '.join(t.name for t in Base.metadata.sorted_tables)} CASCADE"))
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
@@ -0,0 +1,46 @@
+import asyncio
+from collections import Counter
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import func, select, text
+
+from app.db.session import SessionLocal, engine
+from app.models.entities import AssetIssuance
+from app.schemas.entities import BulkIssueItem, BulkReturnItem
+
+CONCURRENT_ISSUES = 20
+
+
+async def warm_pool():
+    # With only one warm connection the first request commits before the rest have connected, and nothing races.
+    async def hold():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT pg_sleep(0.05)"))
+    await asyncio.gather(*(hold() for _ in range(engine.pool.size())))
+
+
+async def test_concurrent_issues_of_one_asset_admit_exactly_one(client):
+    asset = (await client.post("/assets", json={"asset_tag": "R-1", "type": "radio"})).json()
+    guards = [
+        (await client.post("/guards", json={"guard_no": f"G-{i}", "full_name": f"Guard {i}", "hire_date": "2026-01-01", "base_salary_monthly": "500000"})).json()
+        for i in range(CONCURRENT_ISSUES)
+    ]
+    await warm_pool()
+    responses = await asyncio.gather(*(client.post(f"/assets/{asset['id']}/issue", json={"guard_id": g["id"]}) for g in guards))
+    statuses = Counter(r.status_code for r in responses)
+    assert statuses[200] == 1
+    assert statuses[400] + statuses[409] == CONCURRENT_ISSUES - 1
+    async with SessionLocal() as session:
+        open_issuances = await session.scalar(select(func.count()).select_from(AssetIssuance).where(AssetIssuance.asset_id == asset["id"], AssetIssuance.status == "issued"))
+    assert open_issuances == 1
+    assert (await client.get(f"/assets/{asset['id']}")).json()["status"] == "issued"
+
+
+@pytest.mark.parametrize("keys", [{}, {"asset_id": str(uuid4()), "asset_tag": "R-1"}])
+def test_bulk_items_need_exactly_one_asset_key(keys):
+    with pytest.raises(ValidationError, match="exactly one of asset_id or asset_tag"):
+        BulkIssueItem(guard_id=uuid4(), **keys)
+    with pytest.raises(ValidationError, match="exactly one of asset_id or asset_tag"):
+        BulkReturnItem(return_condition="good", **keys)
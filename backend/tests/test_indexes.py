@@ -0,0 +1,81 @@
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, select, text, tuple_
+
+from app.db.session import SessionLocal
+from app.models.entities import Asset, AssetIssuance, Client, Guard, Invoice
+
+INVOICE_STATUSES = ["draft", "sent", "part_paid", "paid", "void"]
+
+
+@pytest.fixture
+async def seeded(db):
+    # Enough analysed rows that the planner weighs the indexes instead of reading a handful of pages.
+    now = datetime.utcnow()
+    clients = [{"id": uuid4(), "name": f"Client {i}", "created_at": now, "updated_at": now} for i in range(50)]
+    invoices = [
+        {"id": uuid4(), "client_id": clients[i % 50]["id"], "invoice_no": f"INV-{i:06d}", "issue_date": date(2026, 1, 1), "due_date": date(2026, 1, 31),
+         "status": INVOICE_STATUSES[i % 5], "subtotal": Decimal("100"), "tax_total": Decimal("0"), "total": Decimal("100"), "amount_paid": Decimal("0"),
+         "balance_due": Decimal("100"), "created_at": now - timedelta(minutes=i), "updated_at": now}
+        for i in range(5000)
+    ]
+    guard = {"id": uuid4(), "guard_no": "G-1", "full_name": "Asha Juma", "hire_date": date(2026, 1, 1), "base_salary_monthly": Decimal("1"), "created_at": now, "updated_at": now}
+    assets = [{"id": uuid4(), "asset_tag": f"R-{i}", "type": "radio", "created_at": now, "updated_at": now} for i in range(500)]
+    issuances = [
+        {"id": uuid4(), "asset_id": assets[i % 500]["id"], "guard_id": guard["id"], "issue_condition": "good", "issued_at": now, "status": "issued" if i < 100 else "returned"}
+        for i in range(5000)
+    ]
+    async with SessionLocal() as session:
+        for model, rows in ((Client, clients), (Invoice, invoices), (Guard, [guard]), (Asset, assets), (AssetIssuance, issuances)):
+            await session.execute(insert(model), rows)
+        await session.commit()
+        await session.execute(text("ANALYZE clients, invoices, assets, asset_issuances"))
+        await session.commit()
+    return {"client_id": clients[7]["id"], "asset_id": assets[3]["id"], "cursor": (now - timedelta(minutes=2500), invoices[2500]["id"])}
+
+
+def index_names(node) -> set[str]:
+    names = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def plan_indexes(stmt) -> set[str]:
+    async with SessionLocal() as session:
+        conn = await session.connection()
+        compiled = stmt.compile(dialect=conn.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar_one()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return index_names(plan[0]["Plan"])
+
+
+async def test_keyset_page_walks_the_created_at_index(seeded):
+    # The same shape list_entities issues for a cursor page.
+    stmt = (
+        select(Invoice)
+        .where(tuple_(Invoice.created_at, Invoice.id) < tuple_(*seeded["cursor"]))
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        .limit(51)
+    )
+    assert "ix_invoices_created_at" in await plan_indexes(stmt)
+
+
+async def test_client_status_filter_uses_the_composite_index(seeded):
+    stmt = (
+        select(Invoice)
+        .where(Invoice.client_id == seeded["client_id"], Invoice.status == "sent")
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        .limit(51)
+    )
+    assert "ix_invoices_client_status" in await plan_indexes(stmt)
+
+
+async def test_open_issuance_lookup_uses_the_partial_index(seeded):
+    stmt = select(AssetIssuance).where(AssetIssuance.asset_id == seeded["asset_id"], AssetIssuance.status == "issued")
+    assert "uq_asset_issuances_open" in await plan_indexes(stmt)
@@ -0,0 +1,16 @@
+async def test_patch_invoice_only_touches_editable_fields(client):
+    acme = (await client.post("/clients", json={"name": "Acme"})).json()
+    created = await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-01", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": "110"}]})
+    invoice = created.json()
+
+    response = await client.patch(
+        f"/invoices/{invoice['id']}",
+        json={"due_date": "2026-02-15", "notes": "Net 45", "items": [], "total": "1", "status": "paid", "invoice_no": "X-1"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["due_date"] == "2026-02-15"
+    assert {k: body[k] for k in ("invoice_no", "status", "total", "balance_due")} == {k: invoice[k] for k in ("invoice_no", "status", "total", "balance_due")}
+    detail = (await client.get(f"/invoices/{invoice['id']}")).json()
+    assert detail["notes"] == "Net 45"
+    assert len(detail["items"]) == 1
@@ -0,0 +1,158 @@
+import asyncio
+import smtplib
+import socket
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.entities import EmailOutbox
+from app.services import outbox
+from app.services.outbox import OutboxMetrics, SMTPPool, process_batch, run_worker
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # smtplib greets once per connection.
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    handler, port = Inbox(), free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(settings, "smtp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_port", port)
+    monkeypatch.setattr(settings, "smtp_starttls", False)
+    monkeypatch.setattr(settings, "smtp_user", None)
+    yield handler
+    controller.stop()
+
+
+def message(n: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = "ops@example.test", f"client{n}@example.test", f"Invoice {n}"
+    msg.set_content("Please find your invoice attached.")
+    return msg
+
+
+async def test_pool_reuses_connections(inbox):
+    pool = SMTPPool(2)
+    await asyncio.gather(*(pool.send(message(n)) for n in range(6)))
+    await pool.close()
+    assert len(inbox.messages) == 6
+    assert inbox.connections == 2
+
+
+async def test_pool_reconnects_when_the_server_drops_the_connection(inbox):
+    pool = SMTPPool(1)
+    await pool.send(message(1))
+    conn = pool.idle.get_nowait()
+    conn.sock.shutdown(socket.SHUT_RDWR)
+    pool.idle.put_nowait(conn)
+    await pool.send(message(2))
+    await pool.close()
+    assert len(inbox.messages) == 2
+    assert inbox.connections == 2
+
+
+def test_failed_resend_closes_the_fresh_connection(monkeypatch):
+    class Connection:
+        def __init__(self, error):
+            self.error, self.closed = error, False
+
+        def send_message(self, msg):
+            raise self.error
+
+        def close(self):
+            self.closed = True
+
+    stale, fresh = Connection(smtplib.SMTPServerDisconnected("gone")), Connection(smtplib.SMTPDataError(554, b"rejected"))
+    monkeypatch.setattr(SMTPPool, "connect", classmethod(lambda cls: fresh))
+    with pytest.raises(smtplib.SMTPDataError):
+        SMTPPool.send_blocking(stale, message(1))
+    assert stale.closed and fresh.closed
+
+
+async def test_worker_refuses_to_start_without_smtp_host(monkeypatch):
+    monkeypatch.setattr(settings, "smtp_host", None)
+    with pytest.raises(RuntimeError, match="SMTP_HOST"):
+        await run_worker()
+
+
+async def test_process_batch_delivers_and_retries(db, inbox, monkeypatch):
+    async with SessionLocal() as session:
+        session.add_all(EmailOutbox(type="statement", to_email=f"client{n}@example.test", subject=f"Statement {n}", body="Attached.") for n in range(3))
+        await session.commit()
+    metrics = OutboxMetrics()
+    assert await process_batch(SMTPPool(2), metrics) == 3
+    assert metrics.sent == 3 and len(inbox.messages) == 3
+
+    async with SessionLocal() as session:
+        assert {r.status for r in (await session.scalars(select(EmailOutbox))).all()} == {"sent"}
+        session.add(EmailOutbox(type="statement", to_email="late@example.test", subject="Statement", body="Attached."))
+        await session.commit()
+    monkeypatch.setattr(settings, "smtp_port", free_port())
+    assert await process_batch(SMTPPool(1), metrics) == 1
+    async with SessionLocal() as session:
+        row = await session.scalar(select(EmailOutbox).where(EmailOutbox.to_email == "late@example.test"))
+    assert (row.status, row.attempts, metrics.retried) == ("queued", 1, 1)
+    assert row.next_attempt_at is not None and row.error
+
+
+async def test_failed_pdf_render_is_a_failed_attempt(client, inbox, monkeypatch):
+    acme = (await client.post("/clients", json={"name": "Acme"})).json()
+    invoice = (await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-01", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": "110"}]})).json()
+    async with SessionLocal() as session:
+        session.add(EmailOutbox(type="invoice", invoice_id=invoice["id"], to_email="acme@example.test", subject="Invoice", body="Attached."))
+        session.add(EmailOutbox(type="statement", to_email="other@example.test", subject="Statement", body="Attached."))
+        await session.commit()
+
+    async def broken_render(session, inv):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(outbox, "invoice_pdf_path", broken_render)
+    monkeypatch.setattr(settings, "outbox_max_attempts", 1)
+    metrics = OutboxMetrics()
+    assert await process_batch(SMTPPool(1), metrics) == 2
+    async with SessionLocal() as session:
+        rows = {r.type: r for r in (await session.scalars(select(EmailOutbox))).all()}
+    assert (rows["invoice"].status, rows["invoice"].attempts, rows["invoice"].error) == ("failed", 1, "disk full")
+    assert rows["statement"].status == "sent" and len(inbox.messages) == 1
+
+
+async def test_worker_survives_a_failed_batch(inbox, monkeypatch, caplog):
+    stop, calls = asyncio.Event(), []
+
+    async def flaky_batch(pool, metrics):
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("database went away")
+        stop.set()
+        return 0
+
+    monkeypatch.setattr(outbox, "process_batch", flaky_batch)
+    monkeypatch.setattr(settings, "outbox_poll_seconds", 0.01)
+    await run_worker(stop)
+    assert len(calls) == 2
+    assert "outbox batch failed" in caplog.text
@@ -0,0 +1,59 @@
+import asyncio
+from collections import Counter
+
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models.entities import Payment
+
+
+async def sent_invoices(client, *prices) -> tuple[str, list[str]]:
+    acme = (await client.post("/clients", json={"name": "Acme"})).json()
+    ids = []
+    for price in prices:
+        invoice = (await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-05", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": price}]})).json()
+        await client.post(f"/invoices/{invoice['id']}/send", json={"to_email": "acme@example.test"})
+        ids.append(invoice["id"])
+    return acme["id"], ids
+
+
+def payment(client_id: str, amount: str, allocations: list[tuple[str, str]]) -> dict:
+    return {"client_id": client_id, "payment_date": "2026-01-15", "amount": amount, "method": "bank", "allocations": [{"invoice_id": i, "amount": a} for i, a in allocations]}
+
+
+async def payment_count() -> int:
+    async with SessionLocal() as session:
+        return await session.scalar(select(func.count()).select_from(Payment))
+
+
+async def test_payment_settles_several_invoices(client):
+    client_id, (first, second) = await sent_invoices(client, "110", "200")
+    response = await client.post("/payments", json=payment(client_id, "300", [(first, "110"), (second, "150")]))
+    assert response.status_code == 200
+    invoices = {i: (await client.get(f"/invoices/{i}")).json() for i in (first, second)}
+    assert [(v["amount_paid"], v["balance_due"], v["status"]) for v in invoices.values()] == [("110.00", "0.00", "paid"), ("150.00", "50.00", "part_paid")]
+    assert [len(v["allocations"]) for v in invoices.values()] == [1, 1]
+
+
+async def test_rejected_payments_change_nothing(client):
+    client_id, (first, second) = await sent_invoices(client, "110", "200")
+    rejected = {
+        "Allocations exceed payment amount": payment(client_id, "100", [(first, "60"), (second, "60")]),
+        "Duplicate invoice in allocations": payment(client_id, "100", [(first, "50"), (first, "50")]),
+        "Allocation exceeds balance": payment(client_id, "500", [(first, "120")]),
+    }
+    for detail, body in rejected.items():
+        response = await client.post("/payments", json=body)
+        assert response.status_code == 400 and response.json()["detail"].startswith(detail), detail
+    assert await payment_count() == 0
+    invoice = (await client.get(f"/invoices/{first}")).json()
+    assert (invoice["amount_paid"], invoice["balance_due"], invoice["status"]) == ("0.00", "110.00", "sent")
+
+
+async def test_concurrent_payments_cannot_overpay_an_invoice(client):
+    client_id, (invoice_id,) = await sent_invoices(client, "110")
+    responses = await asyncio.gather(*(client.post("/payments", json=payment(client_id, "80", [(invoice_id, "80")])) for _ in range(2)))
+    assert Counter(r.status_code for r in responses) == {200: 1, 400: 1}
+    invoice = (await client.get(f"/invoices/{invoice_id}")).json()
+    assert (invoice["amount_paid"], invoice["balance_due"], invoice["status"]) == ("80.00", "30.00", "part_paid")
+    assert await payment_count() == 1
@@ -0,0 +1,68 @@
+import asyncio
+from decimal import Decimal
+
+from app.db.session import SessionLocal
+from app.models.entities import PayrollAdjustment, PayrollItem
+from app.services.core import recompute_payroll
+
+
+async def payroll_item(client) -> dict:
+    await client.post("/guards", json={"guard_no": "G-1", "full_name": "Asha Juma", "hire_date": "2026-01-01", "base_salary_monthly": "500000", "housing_allowance_monthly": "50000"})
+    month = (await client.post("/payroll-months", json={"month": "2026-01-01"})).json()
+    await client.post(f"/payroll-months/{month['id']}/generate-items")
+    return (await client.get(f"/payroll-months/{month['id']}/items")).json()[0]
+
+
+async def test_recompute_waits_for_an_adjustment_in_flight(client):
+    item = await payroll_item(client)
+    await client.post(f"/payroll-items/{item['id']}/adjustments", json={"type": "overtime", "label": "Night shift", "amount": "20000"})
+
+    # The item is already dirty, so a concurrent adjustment adds a row without writing the item again.
+    async with SessionLocal() as writer:
+        writer.add(PayrollAdjustment(payroll_item_id=item["id"], type="deduction", label="Uniform", amount=Decimal("5000")))
+        await writer.flush()
+        async with SessionLocal() as session:
+            recompute = asyncio.create_task(recompute_payroll(session, item["payroll_month_id"]))
+            await asyncio.sleep(0.2)
+            assert not recompute.done()
+            await writer.commit()
+            assert await recompute == 1
+
+    async with SessionLocal() as session:
+        row = await session.get(PayrollItem, item["id"])
+    assert (row.overtime_amount, row.deductions_total, row.needs_recompute) == (Decimal("20000.00"), Decimal("5000.00"), False)
+    assert row.net_pay == Decimal("565000.00")
+
+
+async def item_totals(item_id) -> tuple:
+    async with SessionLocal() as session:
+        row = await session.get(PayrollItem, item_id)
+    return row.allowances_total, row.overtime_amount, row.deductions_total, row.net_pay, row.needs_recompute
+
+
+async def test_recompute_is_repeatable(client):
+    item = await payroll_item(client)
+    month_id = item["payroll_month_id"]
+    for body in ({"type": "allowance", "label": "Meals", "amount": "10000"}, {"type": "overtime", "label": "Night shift", "amount": "20000"}, {"type": "deduction", "label": "Uniform", "amount": "5000"}):
+        await client.post(f"/payroll-items/{item['id']}/adjustments", json=body)
+    expected = (Decimal("60000.00"), Decimal("20000.00"), Decimal("5000.00"), Decimal("575000.00"), False)
+
+    assert (await client.post(f"/payroll-months/{month_id}/recompute")).json()["items"] == 1
+    assert await item_totals(item["id"]) == expected
+    assert (await client.post(f"/payroll-months/{month_id}/recompute")).json()["items"] == 0
+    assert (await client.post(f"/payroll-months/{month_id}/recompute", params={"full": True})).json()["items"] == 1
+    assert await item_totals(item["id"]) == expected
+
+
+async def test_recompute_after_deleting_an_adjustment(client):
+    item = await payroll_item(client)
+    month_id = item["payroll_month_id"]
+    adjustment = (await client.post(f"/payroll-items/{item['id']}/adjustments", json={"type": "deduction", "label": "Advance", "amount": "30000"})).json()
+    await client.post(f"/payroll-months/{month_id}/recompute")
+    assert (await item_totals(item["id"]))[3] == Decimal("520000.00")
+
+    await client.delete(f"/payroll-adjustments/{adjustment['id']}")
+    assert (await item_totals(item["id"]))[4] is True
+    await client.post(f"/payroll-months/{month_id}/recompute")
+    await client.post(f"/payroll-months/{month_id}/recompute")
+    assert await item_totals(item["id"]) == (Decimal("50000.00"), Decimal("0.00"), Decimal("0.00"), Decimal("550000.00"), False)
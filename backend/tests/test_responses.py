@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import orjson
+from asyncpg.pgproto.pgproto import UUID as AsyncpgUUID
+
+from app.api.responses import JSONResponse
+from app.db.session import SessionLocal
+from app.models.entities import Client
+from app.schemas.entities import ClientRead
+from app.services.core import list_entities
+
+LIST_ROUTES = ["/clients", "/sites", "/guards", "/assets", "/invoices", "/payments", "/payroll-months", "/jobs"]
+
+
+def test_renders_driver_types_like_pydantic():
+    entity_id = AsyncpgUUID(str(uuid4()))
+    body = orjson.loads(JSONResponse({"id": entity_id, "amount": Decimal("110.00"), "at": datetime(2026, 1, 1, tzinfo=timezone.utc)}).body)
+    assert body == {"id": str(entity_id), "amount": "110.00", "at": "2026-01-01T00:00:00Z"}
+
+
+async def test_list_entities_rows_serialise(db):
+    async with SessionLocal() as session:
+        session.add(Client(name="Acme"))
+        await session.commit()
+        page = await list_entities(session, Client, fields=list(ClientRead.model_fields))
+    body = orjson.loads(JSONResponse(page).body)
+    assert body["items"][0]["id"] == str(page["items"][0]["id"])
+    assert body["items"][0]["opening_balance"] == "0.00"
+
+
+async def test_list_routes_serialise_postgres_rows(client):
+    acme = (await client.post("/clients", json={"name": "Acme"})).json()
+    await client.post("/sites", json={"client_id": acme["id"], "name": "Gate"})
+    await client.post("/guards", json={"guard_no": "G-1", "full_name": "Asha Juma", "hire_date": "2026-01-01", "base_salary_monthly": "500000"})
+    await client.post("/assets", json={"asset_tag": "R-1", "type": "radio"})
+    await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-01", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": "110"}]})
+    await client.post("/payments", json={"client_id": acme["id"], "payment_date": "2026-01-15", "amount": "50", "method": "bank"})
+    month = (await client.post("/payroll-months", json={"month": "2026-01-01"})).json()
+    await client.post(f"/payroll-months/{month['id']}/export")
+    for path in LIST_ROUTES:
+        response = await client.get(path)
+        assert response.status_code == 200, path
+        assert response.headers["etag"]
+        assert len(response.json()["items"]) == 1, path
+
+
+async def test_list_fields_are_limited_to_the_read_schema(client):
+    await client.post("/guards", json={"guard_no": "G-1", "full_name": "Asha Juma", "hire_date": "2026-01-01", "base_salary_monthly": "500000"})
+    response = await client.get("/guards", params={"fields": "full_name,national_id,home_address"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: national_id, home_address"
+    response = await client.get("/assets", params={"fields": "asset_tag,purchase_cost"})
+    assert response.status_code == 400
+    response = await client.get("/guards", params={"fields": "full_name"})
+    assert response.status_code == 200
+    assert set(response.json()["items"][0]) == {"id", "full_name"}
+
+
+async def test_statement_money_is_decimal_strings(client):
+    acme = (await client.post("/clients", json={"name": "Acme", "opening_balance": "25.50"})).json()
+    invoice = (await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-05", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": "110"}]})).json()
+    await client.post(f"/invoices/{invoice['id']}/send", json={"to_email": "acme@example.test"})
+    await client.post("/payments", json={"client_id": acme["id"], "payment_date": "2026-01-15", "amount": "50", "method": "bank", "allocations": [{"invoice_id": invoice["id"], "amount": "50"}]})
+    body = (await client.get(f"/clients/{acme['id']}/statement", params={"from": "2026-01-01", "to": "2026-01-31"})).json()
+    assert body["opening_balance"] == "25.50"
+    assert body["closing_balance"] == "85.50"
+    assert [(e["debit"], e["credit"], e["balance"]) for e in body["entries"]] == [("110.00", "0.00", "135.50"), ("0.00", "50.00", "85.50")]
+
+
+async def test_dashboard_money_is_a_decimal_string(client):
+    acme = (await client.post("/clients", json={"name": "Acme"})).json()
+    invoice = (await client.post("/invoices", json={"client_id": acme["id"], "issue_date": "2026-01-05", "due_date": "2026-01-31", "items": [{"description": "Guarding", "unit_price": "110"}]})).json()
+    await client.post(f"/invoices/{invoice['id']}/send", json={"to_email": "acme@example.test"})
+    body = (await client.get("/dashboard/summary")).json()
+    assert body["outstanding_receivables"] == "110.00"
+
+
+async def test_list_etag_varies_with_page_and_projection(client):
+    for n in range(3):
+        await client.post("/clients", json={"name": f"Client {n}"})
+    etag = (await client.get("/clients")).headers["etag"]
+    assert (await client.get("/clients", headers={"If-None-Match": etag})).status_code == 304
+    first = await client.get("/clients", params={"limit": 2})
+    assert first.status_code == 200 and first.headers["etag"] != etag
+    for params in ({"limit": 2, "cursor": first.json()["next_cursor"]}, {"fields": "name"}):
+        response = await client.get("/clients", params=params, headers={"If-None-Match": etag})
+        assert response.status_code == 200, params
+        assert response.headers["etag"] != etag
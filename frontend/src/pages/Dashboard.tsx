@@ -2,19 +2,33 @@ import { useEffect, useState } from 'react';
 import { api } from '../lib/api';
 import Card from '../components/ui/Card';
 
+type Summary = {
+  guards: Record<string, number>;
+  clients: Record<string, number>;
+  sites: Record<string, number>;
+  assets: Record<string, number>;
+  open_issuances: number;
+  outstanding_receivables: string;
+  payroll_month: { month: string; status: string } | null;
+};
+
+const total = (counts: Record<string, number>) => Object.values(counts).reduce((sum, n) => sum + n, 0);
+
 export default function Dashboard() {
-  const [stats, setStats] = useState({ guards: 0, clients: 0, sites: 0, assetsAvail: 0, payroll: '-' });
+  const [stats, setStats] = useState<Record<string, string | number>>({ guards: 0, clients: 0, sites: 0, assetsAvail: 0, payroll: '-' });
 
   useEffect(() => {
     (async () => {
-      const [guards, clients, sites, assets, months] = await Promise.all([
-        api<any[]>('/guards'),
-        api<any[]>('/clients'),
-        api<any[]>('/sites'),
-        api<any[]>('/assets?status=available'),
-        api<any[]>('/payroll-months'),
-      ]);
-      setStats({ guards: guards.length, clients: clients.length, sites: sites.length, assetsAvail: assets.length, payroll: months[0]?.month || '-' });
+      const s = await api<Summary>('/dashboard/summary');
+      setStats({
+        guards: total(s.guards),
+        clients: total(s.clients),
+        sites: total(s.sites),
+        assetsAvail: s.assets.available ?? 0,
+        openIssuances: s.open_issuances,
+        receivables: s.outstanding_receivables,
+        payroll: s.payroll_month?.month || '-',
+      });
     })();
   }, []);
 
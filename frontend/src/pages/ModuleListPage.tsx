@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { api } from '../lib/api';
 import Badge from '../components/ui/Badge';
 import Button from '../components/ui/Button';
@@ -24,6 +24,12 @@ type ModuleListPageProps = {
   hideCardFallback?: boolean;
 };
 
+type ListPage = {
+  items: any[];
+  total: number | null;
+  next_cursor: string | null;
+};
+
 function formatLabel(value: string) {
   return value
     .split('_')
@@ -47,65 +53,94 @@ function FieldValue({ item, field }: { item: any; field: ModuleField }) {
 
 export default function ModuleListPage({ title, path, fields, filters = ['all'], hideCardFallback = false }: ModuleListPageProps) {
   const [items, setItems] = useState<any[]>([]);
+  const [total, setTotal] = useState<number | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [search, setSearch] = useState('');
+  const [query, setQuery] = useState('');
   const [activeFilter, setActiveFilter] = useState(filters[0]);
+  const request = useRef(0);
 
   const primaryField = fields.find((field) => field.primary) ?? fields[0];
 
   useEffect(() => {
-    let alive = true;
+    const timer = setTimeout(() => setQuery(search.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [search]);
+
+  // Search and status filter on the server, so every page after the first matches them too.
+  const fetchPage = useCallback(
+    (cursor?: string) => {
+      const params = new URLSearchParams();
+      if (query) {
+        params.set('q', query);
+      }
+      if (activeFilter !== 'all') {
+        params.set('status', activeFilter);
+      }
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const qs = params.toString();
+      return api<ListPage>(`/${path}${qs ? `?${qs}` : ''}`);
+    },
+    [activeFilter, path, query],
+  );
+
+  useEffect(() => {
+    const current = ++request.current;
 
     async function load() {
       try {
         setLoading(true);
         setError('');
-        const data = await api<any[]>(`/${path}`);
-        if (!alive) {
+        const data = await fetchPage();
+        if (current !== request.current) {
           return;
         }
-        setItems(data);
+        setItems(data.items);
+        setTotal(data.total);
+        setNextCursor(data.next_cursor);
       } catch (loadError: any) {
-        if (!alive) {
+        if (current !== request.current) {
           return;
         }
         setError(loadError?.message || `Failed to load ${title.toLowerCase()}.`);
       } finally {
-        if (alive) {
+        if (current === request.current) {
           setLoading(false);
         }
       }
     }
 
     load();
-    return () => {
-      alive = false;
-    };
-  }, [path, title]);
-
-  const visibleItems = useMemo(() => {
-    const query = search.trim().toLowerCase();
-
-    return items.filter((item) => {
-      const matchesSearch =
-        !query ||
-        fields.some((field) => {
-          const candidate = field.render ? field.render(item) : item[field.key];
-          return candidate !== undefined && candidate !== null && String(candidate).toLowerCase().includes(query);
-        });
-
-      if (!matchesSearch) {
-        return false;
-      }
+  }, [fetchPage, title]);
 
-      if (activeFilter === 'all') {
-        return true;
+  async function loadMore() {
+    if (!nextCursor) {
+      return;
+    }
+    const current = request.current;
+    try {
+      setLoadingMore(true);
+      const data = await fetchPage(nextCursor);
+      if (current !== request.current) {
+        return;
       }
-
-      return String(item.status || '').toLowerCase() === activeFilter.toLowerCase();
-    });
-  }, [activeFilter, fields, items, search]);
+      setItems((existing) => [...existing, ...data.items]);
+      setNextCursor(data.next_cursor);
+    } catch (loadError: any) {
+      if (current === request.current) {
+        setError(loadError?.message || `Failed to load ${title.toLowerCase()}.`);
+      }
+    } finally {
+      if (current === request.current) {
+        setLoadingMore(false);
+      }
+    }
+  }
 
   const hasStatusColumn = fields.some((field) => field.key === 'status');
 
@@ -128,11 +163,11 @@ export default function ModuleListPage({ title, path, fields, filters = ['all'],
 
       {loading && <Card className='text-sm text-text-secondary'>Loading {title.toLowerCase()}...</Card>}
       {!loading && error && <Card className='text-sm text-danger'>Error: {error}</Card>}
-      {!loading && !error && visibleItems.length === 0 && (
+      {!loading && !error && items.length === 0 && (
         <Card className='text-sm text-text-secondary'>No {title.toLowerCase()} found for the selected criteria.</Card>
       )}
 
-      {!loading && !error && visibleItems.length > 0 && (
+      {!loading && !error && items.length > 0 && (
         <>
           <Card className={`p-0 ${hideCardFallback ? 'overflow-x-auto' : 'hidden md:block md:overflow-x-auto'}`}>
             <Table>
@@ -150,7 +185,7 @@ export default function ModuleListPage({ title, path, fields, filters = ['all'],
                 </TableRow>
               </TableHead>
               <TableBody>
-                {visibleItems.map((item) => (
+                {items.map((item) => (
                   <TableRow key={item.id}>
                     {fields.map((field) => (
                       <TableCell key={field.key} className={field.sticky ? 'sticky left-0 z-10 bg-surface shadow-[4px_0_6px_-4px_rgba(0,0,0,0.15)]' : ''}>
@@ -171,7 +206,7 @@ export default function ModuleListPage({ title, path, fields, filters = ['all'],
 
           {!hideCardFallback && (
             <div className='space-y-3 md:hidden'>
-              {visibleItems.map((item) => (
+              {items.map((item) => (
                 <Card key={item.id} className='space-y-3'>
                   <div className='flex items-center justify-between'>
                     <h2 className='text-base font-medium'>
@@ -203,16 +238,13 @@ export default function ModuleListPage({ title, path, fields, filters = ['all'],
           )}
 
           <Card className='flex items-center justify-between text-sm text-text-secondary'>
-            <span>Showing {visibleItems.length} records</span>
-            <div className='flex items-center gap-2'>
-              <Button variant='ghost' disabled>
-                Previous
-              </Button>
-              <span>Page 1</span>
-              <Button variant='ghost' disabled>
-                Next
-              </Button>
-            </div>
+            <span>
+              Showing {items.length}
+              {total !== null && ` of ${total}`} records
+            </span>
+            <Button variant='ghost' disabled={!nextCursor || loadingMore} onClick={loadMore}>
+              {loadingMore ? 'Loading...' : nextCursor ? 'Load more' : 'All loaded'}
+            </Button>
           </Card>
         </>
       )}